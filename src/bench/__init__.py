@@ -0,0 +1,2 @@
+# Synthetic Instagram exports, parse/diff benchmarks (python -m bench.run) and the
+# upload load test against postgrest_local (python -m bench.upload_load), from src/
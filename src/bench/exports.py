@@ -0,0 +1,82 @@
+# Synthetic Instagram exports: ZIP with media padding, every historical JSON shape,
+# CSV and split followers_N parts. Members are written as streams, so 10M-follower
+# exports never sit in memory.
+
+import hashlib, json, os, zipfile
+from base64 import b32encode
+
+SHAPES = ("string_list_data", "value_only", "username_list", "followers_map", "csv")
+FOLLOWERS_DIR = "connections/followers_and_following"
+_SEPARATORS = ("", "", "", ".", "_")
+
+
+def follower_name(i, seed=0):
+    # Deterministic, Instagram-looking username for index i
+    digest = hashlib.blake2b(f"{seed}:{i}".encode(), digest_size=12).digest()
+    body = b32encode(digest).decode().lower().rstrip("=")
+    size = 5 + digest[0] % 12
+    cut = 2 + digest[1] % (size - 2)
+    return body[:cut] + _SEPARATORS[digest[2] % len(_SEPARATORS)] + body[cut:size]
+
+
+def follower_names(start, stop, seed=0):
+    return (follower_name(i, seed) for i in range(start, stop))
+
+
+def _json_item(shape, name, ts):
+    if shape == "string_list_data":
+        return {
+            "title": "",
+            "media_list_data": [],
+            "string_list_data": [{"href": f"https://www.instagram.com/{name}", "value": name, "timestamp": ts}],
+        }
+    if shape == "value_only":
+        return {"title": "", "media_list_data": [], "string_list_data": [{"value": name, "timestamp": ts}]}
+    return {"username": name}
+
+
+def _write_json(f, shape, names):
+    if shape == "followers_map":
+        f.write(b'{"followers": [')
+    else:
+        f.write(b"[")
+    for k, name in enumerate(names):
+        if k:
+            f.write(b",\n")
+        f.write(json.dumps(_json_item(shape, name, 1700000000 + k), ensure_ascii=False).encode())
+    f.write(b"]}" if shape == "followers_map" else b"]")
+
+
+def _write_csv(f, names):
+    f.write(b"username,full_name,profile_url\r\n")
+    for name in names:
+        f.write(f'{name},"{name.title()}, Jr.",https://www.instagram.com/{name}/\r\n'.encode())
+
+
+def write_member(f, shape, names):
+    if shape == "csv":
+        _write_csv(f, names)
+    else:
+        _write_json(f, shape, names)
+
+
+def write_export(path, start, stop, shape="string_list_data", parts=1, media_mb=0, seed=0):
+    """Write an export ZIP holding followers ``start..stop`` split over ``parts`` members.
+
+    ``media_mb`` of incompressible padding is stored under media/ ahead of the
+    followers, like the photos and videos of a real export.
+    """
+    ext = "csv" if shape == "csv" else "json"
+    count = stop - start
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for k in range(media_mb):
+            zf.writestr(zipfile.ZipInfo(f"media/posts/{k:04d}.jpg"), os.urandom(1024 * 1024), zipfile.ZIP_STORED)
+        zf.writestr("personal_information/personal_information.json", '{"profile_user": []}')
+        for p in range(parts):
+            lo = start + count * p // parts
+            hi = start + count * (p + 1) // parts
+            with zf.open(f"{FOLLOWERS_DIR}/followers_{p + 1}.{ext}", "w", force_zip64=True) as f:
+                write_member(f, shape, follower_names(lo, hi, seed))
+        with zf.open(f"{FOLLOWERS_DIR}/following.json", "w") as f:
+            _write_json(f, "string_list_data", follower_names(0, min(count, 1000), seed + 1))
+    return os.path.getsize(path)
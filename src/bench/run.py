@@ -0,0 +1,132 @@
+# Parse / normalise / diff / serialise benchmark over synthetic exports.
+#
+#   cd src && python -m bench.run --sizes 1000,100000 --out ../bench_results/run.json
+#
+# Each case writes two exports (previous and current, with churn) and times every
+# stage of the Python reference engine; with --dart-project the generated app's
+# parser is timed on the same file through benchmark/parser_benchmark.dart.
+# Results are one JSON document per run, and --baseline prints the ratio of
+# every stage against an earlier run.
+
+import argparse, json, os, platform, shutil, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+
+import export_parser, snapshot_diff, snapshot_file
+from bench.exports import SHAPES, write_export
+
+# <repo>/bench_results, ignored by git, whatever the working directory
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "bench_results")
+
+
+def _timed(stages, name, fn):
+    t = time.perf_counter()
+    result = fn()
+    stages[name] = round(time.perf_counter() - t, 6)
+    return result
+
+
+def _dart_parse(project, export):
+    out = subprocess.run(
+        ["dart", "run", "benchmark/parser_benchmark.dart", os.path.abspath(export)],
+        cwd=project, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run_case(workdir, size, shape, parts, churn, media_mb, dart_project=None):
+    moved = int(size * churn)
+    prev_path = os.path.join(workdir, f"prev-{shape}-{size}-{parts}.zip")
+    now_path = os.path.join(workdir, f"now-{shape}-{size}-{parts}.zip")
+    write_export(prev_path, 0, size, shape, parts, media_mb)
+    export_bytes = write_export(now_path, moved, size + moved, shape, parts, media_mb)
+
+    stages = {}
+    prev = snapshot_diff.Snapshot.from_usernames(
+        export_parser.normalize_usernames(export_parser.extract_followers_from_file(prev_path))
+    )
+    raw = _timed(stages, "parse", lambda: list(export_parser.extract_followers_from_file(now_path)))
+    names = _timed(stages, "normalise", lambda: list(export_parser.normalize_usernames(raw)))
+    now = _timed(stages, "snapshot", lambda: snapshot_diff.Snapshot.from_usernames(names))
+    diff = _timed(stages, "diff", lambda: snapshot_diff.diff(prev, now))
+    snap_path = os.path.join(workdir, "now.igsnap")
+    _timed(stages, "serialise", lambda: snapshot_file.write_snapshot(snap_path, now))
+    with snapshot_file.open_snapshot(snap_path) as mapped:
+        _timed(stages, "diff_mmap", lambda: snapshot_diff.diff(prev, mapped).counts())
+
+    case = {
+        "size": size,
+        "shape": shape,
+        "parts": parts,
+        "export_bytes": export_bytes,
+        "usernames": len(names),
+        "diff": diff.counts(),
+        "stages": stages,
+    }
+    if dart_project:
+        case["dart"] = _dart_parse(dart_project, now_path)
+    os.remove(prev_path)
+    os.remove(now_path)
+    return case
+
+
+def compare(current, baseline):
+    key = lambda c: (c["size"], c["shape"], c["parts"])
+    old = {key(c): c for c in baseline["cases"]}
+    for case in current["cases"]:
+        before = old.get(key(case))
+        if before is None:
+            continue
+        ratios = ", ".join(
+            f"{stage} x{seconds / before['stages'][stage]:.2f}"
+            for stage, seconds in case["stages"].items()
+            if before["stages"].get(stage)
+        )
+        print(f"{case['shape']:>16} n={case['size']:<9} parts={case['parts']}: {ratios}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de parse/diff sobre exports sintéticos.")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="seguidores por export, separados por vírgula (até 10000000)")
+    ap.add_argument("--shapes", default=",".join(SHAPES), help=f"formatos: {', '.join(SHAPES)}")
+    ap.add_argument("--parts", default="1,4", help="quantidade de partes followers_N")
+    ap.add_argument("--churn", type=float, default=0.05, help="fração de seguidores que entra/sai entre exports")
+    ap.add_argument("--media-mb", type=int, default=8, help="MB de mídia no ZIP")
+    ap.add_argument("--dart-project", help="projeto gerado (com flutter pub get) para medir o parser Dart")
+    ap.add_argument("--workdir", help="diretório dos exports temporários")
+    ap.add_argument("--out", help="arquivo JSON de resultados (padrão: <repo>/bench_results/<data>.json)")
+    ap.add_argument("--baseline", help="resultado anterior para comparar")
+    args = ap.parse_args(argv)
+
+    if args.dart_project and shutil.which("dart") is None:
+        ap.error("--dart-project requer o executável dart no PATH")
+
+    started = datetime.now(timezone.utc)
+    result = {
+        "started_at": started.isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": snapshot_diff.np is not None,
+        "cases": [],
+    }
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for size in (int(s) for s in args.sizes.split(",")):
+            for shape in args.shapes.split(","):
+                for parts in (int(p) for p in args.parts.split(",")):
+                    case = run_case(workdir, size, shape, parts, args.churn, args.media_mb, args.dart_project)
+                    result["cases"].append(case)
+                    print(f"{shape:>16} n={size:<9} parts={parts}: "
+                          + ", ".join(f"{k} {v:.3f}s" for k, v in case["stages"].items()), flush=True)
+
+    out = args.out or os.path.join(RESULTS_DIR, started.strftime("%Y%m%dT%H%M%SZ") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"resultados em {out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
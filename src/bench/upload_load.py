@@ -0,0 +1,192 @@
+# Upload pipeline load test against the local PostgREST stand-in.
+#
+#   cd src && python -m bench.upload_load --users 20 --followers 20000 --rounds 3 --latency-ms 20
+#
+# Each simulated user replays the requests upload_page makes: insert the import,
+# stage the list through BatchWriter-sized chunks (--chunk-size, --concurrency)
+# and call finalize_import; with --delta the rounds after the first stage only
+# the entered/left usernames and call finalize_import_delta, as the snapshot
+# cache does. Round trips and stage latencies are measured on the client and
+# compared with the server-side numbers from /__stats.
+
+import argparse, http.client, json, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import postgrest_local
+from bench.exports import follower_names
+
+OBJECT = {"Accept": postgrest_local.OBJECT_MEDIA_TYPE}
+
+
+class _Client:
+    """One keep-alive connection per thread, as the Supabase HTTP client keeps.
+
+    ``pool`` runs the staging requests of every upload (BatchWriter's workers),
+    so the same ``concurrency`` connections are reused for the whole run; close()
+    shuts it down and closes every connection.
+    """
+
+    def __init__(self, url, token, concurrency=1):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port
+        self.token = token
+        self.local = threading.local()
+        self.conns = []
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.round_trips = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown()
+        with self.lock:
+            conns, self.conns = self.conns, []
+        for conn in conns:
+            conn.close()
+
+    def request(self, method, path, body=None, headers=None):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port)
+            with self.lock:
+                self.conns.append(conn)
+        h = {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json", **(headers or {})}
+        conn.request(method, path, json.dumps(body) if body is not None else None, h)
+        resp = conn.getresponse()
+        data = resp.read()
+        with self.lock:
+            self.round_trips += 1
+        payload = json.loads(data) if data else None
+        if resp.status >= 400:
+            raise RuntimeError(f"{method} {path}: {resp.status} {payload}")
+        return payload
+
+
+def _percentiles(values):
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))], 2)
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(ordered[-1], 2)}
+
+
+def upload(client, uid, usernames, chunk_size, base=None, prev=None):
+    """One upload_page run, staging on ``client.pool``; returns (import_id, {stage: ms}, finalize result)."""
+    stages = {}
+    t = time.perf_counter()
+    imp = client.request("POST", "/rest/v1/imports?select=*", {"user_id": uid, "source": "instagram_export"},
+                         {**OBJECT, "Prefer": "return=representation"})
+    import_id = imp["id"]
+    stages["create_import"] = (time.perf_counter() - t) * 1000
+
+    if base is not None:
+        prev_set, now_set = set(prev), set(usernames)
+        staged = [{"import_id": import_id, "user_id": uid, "username": u, "change": "enter"} for u in usernames if u not in prev_set]
+        staged += [{"import_id": import_id, "user_id": uid, "username": u, "change": "leave"} for u in prev if u not in now_set]
+    else:
+        staged = [{"import_id": import_id, "user_id": uid, "username": u} for u in usernames]
+
+    t = time.perf_counter()
+    chunks = [staged[i:i + chunk_size] for i in range(0, len(staged), chunk_size)]
+    list(client.pool.map(lambda chunk: client.request(
+        "POST", "/rest/v1/import_staging?on_conflict=import_id,username", chunk,
+        {"Prefer": "resolution=ignore-duplicates"},
+    ), chunks))
+    stages["stage_upload"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    if base is not None:
+        result = client.request("POST", "/rest/v1/rpc/finalize_import_delta",
+                                {"p_import_id": import_id, "p_base_import_id": base}, OBJECT)
+    else:
+        result = client.request("POST", "/rest/v1/rpc/finalize_import", {"p_import_id": import_id}, OBJECT)
+    stages["finalize"] = (time.perf_counter() - t) * 1000
+    return import_id, stages, result
+
+
+def run_user(url, index, followers, churn, rounds, chunk_size, concurrency, delta):
+    uid = f"00000000-0000-4000-8000-{index:012d}"
+    moved = int(followers * churn)
+    runs, prev, base = [], None, None
+    with _Client(url, postgrest_local.make_token(uid), concurrency) as client:
+        for r in range(rounds):
+            usernames = list(follower_names(r * moved, r * moved + followers, seed=index))
+            t = time.perf_counter()
+            import_id, stages, result = upload(client, uid, usernames, chunk_size, base if delta else None, prev)
+            runs.append({"stages": stages, "total_ms": (time.perf_counter() - t) * 1000, "result": result})
+            prev, base = usernames, import_id
+    return {"user_id": uid, "round_trips": client.round_trips, "runs": runs}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Teste de carga do pipeline de upload contra o PostgREST local.")
+    ap.add_argument("--url", help="servidor postgrest_local já em execução (padrão: sobe um em memória)")
+    ap.add_argument("--db", default=":memory:", help="SQLite do servidor embutido")
+    ap.add_argument("--latency-ms", type=float, default=0, help="atraso por requisição do servidor embutido")
+    ap.add_argument("--checkpoint-interval", type=int, default=postgrest_local.CHECKPOINT_INTERVAL,
+                    help="checkpoint_interval da variante (servidor embutido)")
+    ap.add_argument("--users", type=int, default=10, help="usuários simulados")
+    ap.add_argument("--parallel", type=int, default=4, help="usuários enviando ao mesmo tempo")
+    ap.add_argument("--followers", type=int, default=10000, help="seguidores por usuário")
+    ap.add_argument("--churn", type=float, default=0.05, help="fração que entra/sai entre envios")
+    ap.add_argument("--rounds", type=int, default=2, help="envios por usuário")
+    ap.add_argument("--chunk-size", type=int, default=1000, help="linhas por requisição (BatchWriter.chunkSize)")
+    ap.add_argument("--concurrency", type=int, default=4, help="requisições em paralelo por envio (BatchWriter.concurrency)")
+    ap.add_argument("--delta", action="store_true", help="envios seguintes só com quem entrou/saiu (cache de snapshot)")
+    ap.add_argument("--out", help="arquivo JSON com os resultados")
+    args = ap.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = postgrest_local.serve_in_thread(args.db, latency_ms=args.latency_ms,
+                                                 checkpoint_interval=args.checkpoint_interval)
+        url = server.url
+    admin = _Client(url, "")
+    admin.request("POST", "/__reset")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+        users = list(pool.map(
+            lambda i: run_user(url, i, args.followers, args.churn, args.rounds, args.chunk_size,
+                               args.concurrency, args.delta),
+            range(args.users),
+        ))
+    elapsed = time.perf_counter() - started
+    server_stats = admin.request("GET", "/__stats")
+    admin.close()
+    if server is not None:
+        server.shutdown()
+
+    runs = [run for user in users for run in user["runs"]]
+    stages = {name: _percentiles([run["stages"][name] for run in runs]) for name in runs[0]["stages"]}
+    summary = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "uploads": len(runs),
+        "seconds": round(elapsed, 3),
+        "uploads_per_second": round(len(runs) / elapsed, 2),
+        "round_trips": sum(user["round_trips"] for user in users),
+        "round_trips_per_upload": round(sum(user["round_trips"] for user in users) / len(runs), 1),
+        "upload_ms": _percentiles([run["total_ms"] for run in runs]),
+        "stages": stages,
+        "server": server_stats,
+    }
+    for name, p in stages.items():
+        print(f"{name:>14}: p50 {p['p50_ms']} ms, p95 {p['p95_ms']} ms, max {p['max_ms']} ms")
+    print(f"{summary['uploads']} envios em {summary['seconds']}s ({summary['uploads_per_second']}/s), "
+          f"{summary['round_trips_per_upload']} requisições por envio")
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+# Streaming Python reference engine for InstagramExportParser (lib/utils/parser.dart)
+#
+# Mirrors extractFollowersFromArchive / extractFollowersFromFile, _parseFollowersJson,
+# _parseFollowersCsv and _usernameFromHref, but never holds a whole ZIP member,
+# decoded string or JSON tree in memory: members are decompressed as a stream and
+# the top-level follower array is decoded one element at a time.
+
+import argparse, codecs, csv, io, json, re, sys, zipfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+CHUNK_SIZE = 64 * 1024
+
+# Same single pattern as the Dart parser, applied to the last path segment:
+# group 1 = followers(_N).json/csv, group 2 = *following*.json/csv (fallback)
+MEMBER_PATTERN = re.compile(r"(?:^|/)(?:(followers(?:_[^/]*)?)|([^/]*following[^/]*))\.(json|csv)$", re.IGNORECASE)
+
+_WS = " \t\r\n"
+_decoder = json.JSONDecoder()
+# An error this close to the end of the buffer may just be a token cut by the
+# chunk boundary ("fals", "\\u00"); further back, the document is malformed
+_CUT_TOKEN = 6
+
+
+def username_from_href(href):
+    # Ex.: https://www.instagram.com/username/
+    # Fast path: slice the first path segment instead of parsing the whole URL
+    scheme = href.find("://")
+    start = 0 if scheme < 0 else href.find("/", scheme + 3)
+    if start < 0:
+        return None
+    n = len(href)
+    while start < n and href[start] == "/":
+        start += 1
+    end = start
+    while end < n and href[end] not in "/?#":
+        end += 1
+    if end == start:
+        return None
+    segment = href[start:end]
+    if "%" in segment or " " in segment:
+        return _username_from_url(href)
+    return segment.lower()
+
+
+def _username_from_url(href):
+    try:
+        path = urlsplit(href).path
+    except ValueError:
+        return None
+    segments = [unquote(s) for s in path.split("/") if s]
+    if not segments:
+        return None
+    return segments[0].lower()
+
+
+class _JsonStream:
+    """Incremental reader over a binary stream that decodes one JSON value at a time."""
+
+    def __init__(self, raw, chunk_size=CHUNK_SIZE):
+        self.raw = raw
+        self.chunk_size = chunk_size
+        self.text = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        if self.eof:
+            return False
+        if self.pos:
+            # Drop the consumed prefix so the buffer only holds the current value
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        data = self.raw.read(size or self.chunk_size)
+        if not data:
+            self.buf += self.text.decode(b"", final=True)
+            self.eof = True
+            return False
+        self.buf += self.text.decode(data)
+        return True
+
+    def peek(self):
+        while True:
+            n = len(self.buf)
+            while self.pos < n and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < n:
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"JSON inválido: esperado {ch!r} na posição {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if not (e.pos >= len(self.buf) - _CUT_TOKEN or e.msg.startswith("Unterminated string")):
+                    raise
+                # Incomplete value: grow the buffer geometrically and retry
+                if not self.fill(max(self.chunk_size, len(self.buf))):
+                    raise
+                continue
+            if end == len(self.buf) and not self.eof:
+                # A scalar cut at the chunk boundary (e.g. "12" of "123") decodes fine; make sure
+                if self.fill():
+                    continue
+            self.pos = end
+            return obj
+
+    def array_items(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            ch = self.peek()
+            self.pos += 1
+            if ch == "]":
+                return
+            if ch != ",":
+                raise ValueError(f"JSON inválido: esperado ',' ou ']' na posição {self.pos}")
+
+
+def iter_follower_items(raw):
+    """Yield each follower entry of a JSON export without decoding the whole document.
+
+    Accepts both shapes handled by the Dart parser: a top-level list, or an object
+    whose ``followers`` key holds the list. Other keys are skipped.
+    """
+    s = _JsonStream(raw)
+    ch = s.peek()
+    if ch == "[":
+        yield from s.array_items()
+    elif ch == "{":
+        s.pos += 1
+        if s.peek() == "}":
+            return
+        while True:
+            key = s.value()
+            s.expect(":")
+            if key == "followers" and s.peek() == "[":
+                yield from s.array_items()
+            else:
+                s.value()
+            ch = s.peek()
+            s.pos += 1
+            if ch == "}":
+                return
+            if ch != ",":
+                raise ValueError(f"JSON inválido: esperado ',' ou '}}' na posição {s.pos}")
+
+
+def parse_followers_json(raw):
+    for item in iter_follower_items(raw):
+        if not isinstance(item, dict):
+            continue
+        sld = item.get("string_list_data")
+        if isinstance(sld, list) and sld:
+            first = sld[0]
+            if isinstance(first, dict) and isinstance(first.get("href"), str):
+                u = username_from_href(first["href"])
+                if u is not None:
+                    yield u
+            elif isinstance(first, dict) and isinstance(first.get("value"), str):
+                yield first["value"].lower()
+        elif isinstance(item.get("username"), str):
+            yield item["username"].lower()
+
+
+USERNAME_HEADERS = {"username", "user_name", "user name", "usuario", "usuário", "nome de usuário", "nome_de_usuario"}
+
+
+def username_column(header):
+    """(index, from_href) of the username column, chosen from the CSV header.
+
+    A username-like header wins; otherwise a profile link column (href/url/link)
+    is used through ``username_from_href``; otherwise the first column.
+    """
+    names = [h.strip().lower() for h in header]
+    for i, name in enumerate(names):
+        if name in USERNAME_HEADERS:
+            return i, False
+    for i, name in enumerate(names):
+        if "href" in name or "url" in name or "link" in name:
+            return i, True
+    return 0, False
+
+
+def parse_followers_csv(raw):
+    # csv.reader is an RFC 4180 tokenizer over the text stream: quoted commas,
+    # quoted newlines and "" escapes are handled, one row at a time
+    rows = csv.reader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+    header = next(rows, None)
+    if header is None:
+        return
+    column, from_href = username_column(header)
+    for row in rows:
+        if column >= len(row):
+            continue
+        value = row[column].strip()
+        candidate = username_from_href(value) if from_href else value.lower()
+        if candidate:
+            yield candidate
+
+
+def _parse_member(name, raw):
+    lower = name.lower()
+    if lower.endswith(".json"):
+        return parse_followers_json(raw)
+    if lower.endswith(".csv"):
+        return parse_followers_csv(raw)
+    return iter(())
+
+
+_PART_NUMBER = re.compile(r"_(\d+)\.(?:json|csv)$", re.IGNORECASE)
+
+
+def select_members(names):
+    """Indices of the members to extract, in one pass over the names.
+
+    Every followers(_N) part, ordered by part number; otherwise the first
+    following JSON as a fallback; otherwise an empty list.
+    """
+    parts, fallback = [], -1
+    for i, name in enumerate(names):
+        m = MEMBER_PATTERN.search(name.replace("\\", "/"))
+        if m is None:
+            continue
+        if m.group(1) is not None:
+            parts.append(i)
+        elif fallback < 0 and m.group(3).lower() == "json":
+            # Fallback: following, caso o usuário queira comparar "quem eu sigo"
+            fallback = i
+    if not parts:
+        return [] if fallback < 0 else [fallback]
+
+    def part_key(i):
+        m = _PART_NUMBER.search(names[i])
+        return (int(m.group(1)) if m else 0, names[i])
+
+    return sorted(parts, key=part_key)
+
+
+def _archive_members(zf):
+    infos = [i for i in zf.infolist() if not i.is_dir()]
+    selected = select_members([i.filename for i in infos])
+    if not selected:
+        raise ValueError("Não encontrei arquivo de seguidores no ZIP.")
+    return [infos[i].filename for i in selected]
+
+
+def extract_followers_from_archive(path):
+    """Yield usernames from the followers member(s) of an Instagram export ZIP.
+
+    Only the central directory is read to pick the members; those alone are
+    decompressed, as a stream, one part after the other.
+    """
+    with zipfile.ZipFile(path) as zf:
+        for name in _archive_members(zf):
+            with zf.open(name) as raw:
+                yield from _parse_member(name, raw)
+
+
+def _parse_archive_part(path, name):
+    with zipfile.ZipFile(path) as zf, zf.open(name) as raw:
+        return list(normalize_usernames(_parse_member(name, raw)))
+
+
+def extract_followers_parallel(path, max_workers=None):
+    """Like ``extract_followers_from_archive`` + ``normalize_usernames``, but each
+    followers_N part is parsed in its own process and the results merged in part order.
+    """
+    with zipfile.ZipFile(path) as zf:
+        names = _archive_members(zf)
+    if len(names) == 1:
+        yield from normalize_usernames(extract_followers_from_archive(path))
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        parts = pool.map(_parse_archive_part, [path] * len(names), names)
+        yield from normalize_usernames(u for part in parts for u in part)
+
+
+def extract_followers_from_file(path):
+    lower = str(path).lower()
+    if lower.endswith(".zip"):
+        yield from extract_followers_from_archive(path)
+        return
+    if not lower.endswith((".json", ".csv")):
+        raise ValueError("Formato não suportado (apenas JSON/CSV/ZIP).")
+    with open(path, "rb") as raw:
+        yield from _parse_member(lower, raw)
+
+
+def normalize_usernames(usernames):
+    # Same normalisation as upload_page: trim, lowercase, drop empties, dedupe (first wins)
+    seen = set()
+    for u in usernames:
+        u = u.strip().lower()
+        if u and u not in seen:
+            seen.add(u)
+            yield u
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Lista os seguidores de um export do Instagram (um por linha).")
+    ap.add_argument("path", help="export.zip, followers.json ou followers.csv")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="processos para exports com várias partes (ZIP)")
+    args = ap.parse_args()
+    if args.jobs > 1 and args.path.lower().endswith(".zip"):
+        usernames = extract_followers_parallel(args.path, args.jobs)
+    else:
+        usernames = normalize_usernames(extract_followers_from_file(args.path))
+    out = sys.stdout
+    for username in usernames:
+        out.write(username + "\n")
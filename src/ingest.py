@@ -0,0 +1,336 @@
+# Offline ingest: Instagram export -> Postgres COPY files for supabase/schema.sql
+#
+# The export is parsed with the streaming engine (export_parser), diffed against
+# the account's local snapshot (snapshot_file) and written as three COPY text
+# files plus a psql script that loads them in one transaction:
+#
+#   imports.copy    one row: id, user_id, source, imported_at, finalized_at
+#   followers.copy  every current follower plus the ones that left, with the
+#                   status finalize_import would leave behind
+#   events.copy     follow / unfollow rows of this import
+#   load.sql        \copy into public.* (followers through an upsert), plus the
+#                   events month partition, the event_daily rollup and the
+#                   follower_checkpoints entry
+#
+# The local snapshot is then replaced by the new one, so the next export of the
+# same account only produces its own delta.
+#
+# Batch mode (ingest_batch) takes a directory with many accounts: each account's
+# exports are ingested in order inside one worker process, accounts run in
+# parallel on a ProcessPoolExecutor.
+
+import json, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # not available on Windows; --memory-mb is ignored there
+    resource = None
+
+import export_parser, snapshot_diff, snapshot_file, snapshot_history
+
+SOURCE = "instagram_export"
+
+IMPORT_COLUMNS = ("id", "user_id", "source", "imported_at", "finalized_at")
+FOLLOWER_COLUMNS = ("user_id", "username", "first_seen", "last_seen", "last_status")
+EVENT_COLUMNS = ("user_id", "username", "type", "happened_at", "import_id")
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+LOAD_SQL = """\
+-- Generated by `main.py ingest`; run from this directory: psql "$DATABASE_URL" -f load.sql
+\\set ON_ERROR_STOP on
+begin;
+
+\\copy public.imports ({imports}) from 'imports.copy'
+
+create temp table followers_in (
+  user_id uuid not null,
+  username text not null,
+  first_seen timestamptz,
+  last_seen timestamptz,
+  last_status text
+) on commit drop;
+\\copy followers_in ({followers}) from 'followers.copy'
+
+-- Same merge as finalize_import: first_seen is kept for known usernames
+insert into public.followers ({followers})
+select {followers} from followers_in
+on conflict (user_id, username) do update
+  set last_seen = excluded.last_seen,
+      last_status = excluded.last_status;
+
+-- Month partition of the events first, then the daily rollup finalize_import keeps
+select public.ensure_events_partition({imported_at});
+\\copy public.events ({events}) from 'events.copy'
+select public.record_event_daily({user_id}, {imported_at}, {follows}, {unfollows}, {follower_count});
+
+-- Server-side history checkpoint, as finalize_import takes one
+select public.checkpoint_user_followers({user_id}, {import_id});
+
+-- Imports were copied with explicit ids
+select setval(pg_get_serial_sequence('public.imports', 'id'), (select max(id) from public.imports));
+
+commit;
+"""
+
+
+def copy_field(value):
+    # COPY text format: \N for NULL, backslash escapes for the delimiter and newlines
+    if value is None:
+        return "\\N"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def copy_line(fields):
+    return "\t".join(copy_field(v) for v in fields) + "\n"
+
+
+def sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def snapshot_path(snapshot_dir, user_id):
+    return os.path.join(snapshot_dir, f"{user_id}.igsnap")
+
+
+def write_copy_files(out_dir, user_id, import_id, imported_at, diff, source=SOURCE):
+    """Write imports/followers/events COPY files and load.sql for one import."""
+    os.makedirs(out_dir, exist_ok=True)
+    at = imported_at.isoformat()
+
+    with open(os.path.join(out_dir, "imports.copy"), "w", encoding="utf-8", newline="\n") as f:
+        f.write(copy_line((import_id, user_id, source, at, at)))
+
+    with open(os.path.join(out_dir, "followers.copy"), "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(copy_line((user_id, u, at, at, "current")) for u in diff.now.usernames())
+        f.writelines(copy_line((user_id, u, at, at, "left")) for u in diff.left)
+
+    with open(os.path.join(out_dir, "events.copy"), "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(copy_line((user_id, u, "follow", at, import_id)) for u in diff.entered)
+        f.writelines(copy_line((user_id, u, "unfollow", at, import_id)) for u in diff.left)
+
+    counts = diff.counts()
+    with open(os.path.join(out_dir, "load.sql"), "w", encoding="utf-8", newline="\n") as f:
+        f.write(LOAD_SQL.format(
+            imports=", ".join(IMPORT_COLUMNS),
+            followers=", ".join(FOLLOWER_COLUMNS),
+            events=", ".join(EVENT_COLUMNS),
+            user_id=sql_literal(user_id),
+            import_id=int(import_id),
+            imported_at=sql_literal(at),
+            follows=counts["entered"],
+            unfollows=counts["left"],
+            follower_count=len(diff.now),
+        ))
+
+
+def ingest(export_path, user_id, import_id, out_dir, snapshot_dir=None, imported_at=None, jobs=1,
+           checkpoint_interval=snapshot_history.DEFAULT_INTERVAL):
+    """Parse ``export_path``, diff it against the account's snapshot and write COPY files.
+
+    Without ``snapshot_dir`` (or on the account's first export) every follower is
+    a follow event, as in the first finalize_import. With it, the import is also
+    added to the account's history (``snapshot_dir/history``); running an import id
+    again (after a failed load.sql) diffs against the history before it and
+    replaces that import and the later ones. Returns the diff counts.
+    """
+    imported_at = imported_at or datetime.now(timezone.utc)
+    if jobs > 1 and str(export_path).lower().endswith(".zip"):
+        usernames = export_parser.extract_followers_parallel(export_path, jobs)
+    else:
+        usernames = export_parser.normalize_usernames(export_parser.extract_followers_from_file(export_path))
+    now = snapshot_diff.Snapshot.from_usernames(usernames)
+
+    snap = snapshot_path(snapshot_dir, user_id) if snapshot_dir else None
+    history = snapshot_history.SnapshotHistory(os.path.join(snapshot_dir, "history"), user_id, checkpoint_interval) if snap else None
+    mapped = snapshot_file.open_snapshot(snap) if snap and os.path.exists(snap) else None
+    try:
+        prev = mapped
+        if mapped is not None and mapped.import_id is not None and mapped.import_id >= import_id:
+            # Rerun of an import (e.g. its load.sql failed): the local snapshot already
+            # includes it, so diff against the history as it was before this import
+            earlier = [i for i in history.imports() if i < import_id]
+            prev = history.as_of(earlier[-1]) if earlier else None
+            history.discard_from(import_id)
+        diff = snapshot_diff.diff(prev or snapshot_diff.Snapshot.from_usernames(()), now)
+        write_copy_files(out_dir, user_id, import_id, imported_at, diff)
+        if history is not None:
+            history.record(import_id, diff)
+        counts = diff.counts()
+    finally:
+        if mapped is not None:
+            mapped.close()
+
+    if snap:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        snapshot_file.write_snapshot(snap, now, import_id)
+    return {"user_id": user_id, "import_id": import_id, "followers": len(now), **counts}
+
+
+EXPORT_SUFFIXES = (".zip", ".json", ".csv")
+
+
+def discover_accounts(root):
+    """{user_id: [export paths]} from ``root/<user_id>.zip`` or ``root/<user_id>/*.zip``.
+
+    An account's exports are ordered by file name (date-stamped names sort
+    chronologically); JSON and CSV exports are accepted as well.
+    """
+    accounts = {}
+    for entry in sorted(os.scandir(root), key=lambda e: e.name):
+        if entry.is_dir():
+            exports = sorted(
+                os.path.join(entry.path, n) for n in os.listdir(entry.path) if n.lower().endswith(EXPORT_SUFFIXES)
+            )
+            if exports:
+                accounts.setdefault(entry.name, []).extend(exports)
+        elif entry.name.lower().endswith(EXPORT_SUFFIXES):
+            accounts.setdefault(os.path.splitext(entry.name)[0], []).append(entry.path)
+    return accounts
+
+
+def _limit_memory(memory_mb):
+    if memory_mb and resource is not None:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def ingest_account(user_id, exports, out_dir, snapshot_dir, checkpoint_interval=snapshot_history.DEFAULT_INTERVAL):
+    """Ingest one account's ``[(import_id, path)]`` in order; stops at the first failure.
+
+    Each export is dated by its mtime, never earlier than the export before it.
+    imports.copy writes that date as finalized_at too, so latest_finalized_import
+    (newest finalized_at, then highest id) returns the account's last import.
+    """
+    results = []
+    imported_at = None
+    for import_id, path in exports:
+        started = time.perf_counter()
+        try:
+            mtime = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+            imported_at = mtime if imported_at is None else max(imported_at, mtime)
+            result = ingest(path, user_id, import_id, os.path.join(out_dir, user_id, str(import_id)), snapshot_dir,
+                            imported_at, checkpoint_interval=checkpoint_interval)
+        except Exception as e:
+            # Later exports would be diffed against the wrong snapshot: skip them
+            results.append({"user_id": user_id, "import_id": import_id, "export": path, "error": f"{type(e).__name__}: {e}"})
+            break
+        result["export"] = path
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        results.append(result)
+    return results
+
+
+def ingest_batch(root, out_dir, first_import_id, snapshot_dir=None, jobs=None, memory_mb=None,
+                 max_tasks_per_child=None, progress=None, checkpoint_interval=snapshot_history.DEFAULT_INTERVAL):
+    """Ingest every account under ``root`` on a process pool.
+
+    Import ids are assigned up front, in account then file order, so the output
+    does not depend on scheduling. Returns the per-account results (in account
+    order) and a throughput summary.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    snapshot_dir = snapshot_dir or os.path.join(out_dir, "snapshots")
+    accounts = discover_accounts(root)
+    next_id = first_import_id
+    plan = {}
+    for user_id, exports in accounts.items():
+        plan[user_id] = [(next_id + i, path) for i, path in enumerate(exports)]
+        next_id += len(exports)
+
+    started = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_limit_memory, initargs=(memory_mb,), max_tasks_per_child=max_tasks_per_child,
+    ) as pool:
+        futures = {
+            pool.submit(ingest_account, user_id, exports, out_dir, snapshot_dir, checkpoint_interval): user_id
+            for user_id, exports in plan.items()
+        }
+        for future in as_completed(futures):
+            user_id = futures[future]
+            try:
+                results[user_id] = future.result()
+            except Exception as e:  # worker died (e.g. killed by the OOM killer)
+                results[user_id] = [{"user_id": user_id, "error": f"{type(e).__name__}: {e}"}]
+            if progress:
+                progress(user_id, results[user_id])
+    elapsed = time.perf_counter() - started
+
+    ordered = [results[user_id] for user_id in plan]
+    done = [r for rs in ordered for r in rs if "error" not in r]
+    followers = sum(r["followers"] for r in done)
+    summary = {
+        "accounts": len(plan),
+        "imports": len(done),
+        "failed": sum(1 for rs in ordered if any("error" in r for r in rs)),
+        "followers": followers,
+        "seconds": round(elapsed, 3),
+        "accounts_per_minute": round(len(plan) * 60 / elapsed, 2) if elapsed else None,
+        "followers_per_second": round(followers / elapsed) if elapsed else None,
+    }
+    write_load_all(out_dir, done)
+    with open(os.path.join(out_dir, "batch.json"), "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "accounts": ordered}, f, indent=2)
+    return ordered, summary
+
+
+def write_load_all(out_dir, results):
+    # psql resolves \copy paths against its working directory, hence the \cd pairs
+    with open(os.path.join(out_dir, "load_all.sql"), "w", encoding="utf-8", newline="\n") as f:
+        f.write('-- Generated by `main.py batch`; run from this directory: psql "$DATABASE_URL" -f load_all.sql\n')
+        for r in sorted(results, key=lambda r: r["import_id"]):
+            f.write(f"\\cd {r['user_id']}/{r['import_id']}\n\\i load.sql\n\\cd ../..\n")
+
+
+def add_arguments(ap):
+    ap.add_argument("export", help="export.zip, followers.json ou followers.csv")
+    ap.add_argument("--user-id", required=True, help="auth.users.id da conta")
+    ap.add_argument("--import-id", type=int, required=True,
+                    help="imports.id a usar (ex.: select nextval('public.imports_id_seq'))")
+    ap.add_argument("--out", required=True, help="diretório dos arquivos COPY e do load.sql")
+    ap.add_argument("--snapshots", help="diretório dos snapshots locais (<user_id>.igsnap)")
+    ap.add_argument("--imported-at", type=datetime.fromisoformat, help="data da importação (ISO 8601, padrão: agora)")
+    ap.add_argument("-j", "--jobs", type=int, default=1, help="processos para exports com várias partes (ZIP)")
+    ap.add_argument("--checkpoint-every", type=int, default=snapshot_history.DEFAULT_INTERVAL,
+                    help="imports entre snapshots completos no histórico")
+
+
+def run(args):
+    imported_at = args.imported_at
+    if imported_at is not None and imported_at.tzinfo is None:
+        imported_at = imported_at.replace(tzinfo=timezone.utc)
+    return ingest(args.export, args.user_id, args.import_id, args.out, args.snapshots, imported_at, args.jobs,
+                  args.checkpoint_every)
+
+
+def add_batch_arguments(ap):
+    ap.add_argument("root", help="diretório com <user_id>.zip ou <user_id>/<export>.zip por conta")
+    ap.add_argument("--first-import-id", type=int, required=True,
+                    help="primeiro imports.id livre (ex.: select nextval('public.imports_id_seq'))")
+    ap.add_argument("--out", required=True, help="diretório de saída (<user_id>/<import_id>/, load_all.sql, batch.json)")
+    ap.add_argument("--snapshots", help="diretório dos snapshots locais (padrão: <out>/snapshots)")
+    ap.add_argument("-j", "--jobs", type=int, help="processos em paralelo (padrão: número de CPUs)")
+    ap.add_argument("--memory-mb", type=int, help="limite de memória por processo (RLIMIT_AS)")
+    ap.add_argument("--max-tasks-per-child", type=int, help="contas por processo antes de reciclá-lo")
+    ap.add_argument("--checkpoint-every", type=int, default=snapshot_history.DEFAULT_INTERVAL,
+                    help="imports entre snapshots completos no histórico")
+
+
+def _print_account(user_id, results):
+    for r in results:
+        if "error" in r:
+            print(f"{user_id}: erro em {r.get('export', '-')}: {r['error']}", flush=True)
+        else:
+            print(f"{user_id} #{r['import_id']}: {r['followers']} seguidores, "
+                  f"+{r['entered']} -{r['left']} ({r['seconds']}s)", flush=True)
+
+
+def run_batch(args):
+    _, summary = ingest_batch(
+        args.root, args.out, args.first_import_id, args.snapshots, args.jobs, args.memory_mb,
+        args.max_tasks_per_child, progress=_print_account, checkpoint_interval=args.checkpoint_every,
+    )
+    return summary
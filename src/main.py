@@ -1,9 +1,24 @@
-# Create a Flutter + Supabase boilerplate as a downloadable zip
+# Create a Flutter + Supabase boilerplate as a downloadable zip, and load
+# Instagram exports offline into COPY files for the same schema
+#
+#   python main.py generate [--out DIR] [--zip PATH] [--force]
+#   python main.py generate --stdout > app.zip
+#   python main.py ingest export.zip --user-id UUID --import-id N --out DIR [--snapshots DIR]
+#   python main.py batch exports/ --first-import-id N --out DIR [-j 8] [--memory-mb 2048]
+#   python main.py variants variants.json --out DIR [-j 8]
 
-import os, json, textwrap, zipfile, pathlib
+import argparse, hashlib, io, os, json, re, sys, textwrap, time, zipfile, pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import ingest
 
 base = "/mnt/data/insta_diff_flutter_supabase"
-os.makedirs(base, exist_ok=True)
+zip_path = "/mnt/data/insta_diff_flutter_supabase.zip"
+# Content hash of every generated file, kept next to them to skip unchanged writes
+MANIFEST = ".generator-manifest.json"
+ZIP_ROOT = "insta_diff_flutter_supabase"
+# Fixed entry timestamp (the ZIP epoch), so the same templates give the same bytes
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
 
 # Directory structure
 dirs = [
@@ -14,15 +29,13 @@ dirs = [
     "assets",
     "supabase",
 ]
-for d in dirs:
-    os.makedirs(os.path.join(base, d), exist_ok=True)
 
 # pubspec.yaml
 pubspec = """
-name: insta_diff
+name: {{package}}
 description: App para comparar seguidores do Instagram via export oficial (sem scraping).
 publish_to: "none"
-version: 0.1.0+1
+version: {{version}}
 
 environment:
   sdk: ">=3.3.0 <4.0.0"
@@ -35,6 +48,7 @@ dependencies:
   file_picker: ^8.0.3
   archive: ^3.6.1
   path: ^1.9.0
+  path_provider: ^2.1.3
   intl: ^0.19.0
   flutter_dotenv: ^5.1.0
 
@@ -52,13 +66,15 @@ flutter:
 
 # .env.example
 env_example = """
-SUPABASE_URL=coloque_sua_url_aqui
-SUPABASE_ANON_KEY=coloque_seu_anon_key_aqui
+SUPABASE_URL={{supabase_url}}
+SUPABASE_ANON_KEY={{supabase_anon_key}}
+# true para gravar a duração de cada etapa do upload em import_metrics
+IMPORT_METRICS={{import_metrics}}
 """
 
 # README.md
 readme = """
-# Insta Diff — Flutter + Supabase (MVP)
+# {{app_name}} — Flutter + Supabase (MVP)
 
 App legal com assinatura para detectar **quem entrou** e **quem saiu** dos seus seguidores do Instagram, usando apenas o **arquivo oficial de exportação** (sem scraping).
 
@@ -69,12 +85,15 @@ App legal com assinatura para detectar **quem entrou** e **quem saiu** dos seus
 4. Rode as migrações SQL do diretório `supabase/` (Tables + Policies).
 5. `flutter pub get`
 6. `flutter run`
+7. `flutter test` roda os testes do parser (`test/parser_test.dart`).
 
 ## Fluxo
 - Login por e-mail (Supabase Magic Link).
 - Upload do ZIP/JSON exportado do Instagram.
 - Parser extrai lista de seguidores (`followers_*.json` ou CSV) e cria um **snapshot**.
 - Comparação com snapshot anterior => eventos **follow/unfollow**.
+  O último snapshot fica em cache no aparelho; se ainda for o da última importação,
+  só quem entrou/saiu é enviado ao Supabase.
 - Telas:
   - Home (resumo),
   - Upload,
@@ -124,9 +143,9 @@ class InstaDiffApp extends StatelessWidget {
   @override
   Widget build(BuildContext context) {
     return MaterialApp(
-      title: 'Insta Diff',
+      title: '{{app_title}}',
       theme: ThemeData(
-        colorScheme: ColorScheme.fromSeed(seedColor: Colors.indigo),
+        colorScheme: ColorScheme.fromSeed(seedColor: {{seed_color}}),
         useMaterial3: true,
       ),
       debugShowCheckedModeBanner: false,
@@ -209,7 +228,7 @@ class _LoginPageState extends State<LoginPage> {
             child: Column(
               mainAxisAlignment: MainAxisAlignment.center,
               children: [
-                const Text("Insta Diff", style: TextStyle(fontSize: 28, fontWeight: FontWeight.bold)),
+                const Text("{{app_title}}", style: TextStyle(fontSize: 28, fontWeight: FontWeight.bold)),
                 const SizedBox(height: 12),
                 const Text("Entre com seu e-mail para receber um link mágico."),
                 const SizedBox(height: 24),
@@ -259,6 +278,8 @@ class _HomePageState extends State<HomePage> {
   int followerCount = 0;
   int newCount = 0;
   int lostCount = 0;
+  int recentNew = 0;
+  int recentLost = 0;
   bool loading = true;
 
   @override
@@ -269,21 +290,18 @@ class _HomePageState extends State<HomePage> {
 
   Future<void> _loadStats() async {
     final supa = Supabase.instance.client;
-    final uid = supa.auth.currentUser!.id;
 
-    final followersResp = await supa
-        .from('followers')
-        .select('*', const FetchOptions(count: CountOption.exact))
-        .eq('user_id', uid);
-    final eventsResp = await supa
-        .from('events')
-        .select('type', const FetchOptions(count: CountOption.exact))
-        .eq('user_id', uid);
+    // One row: the user_stats counters and the last 30 days summed from
+    // event_daily on the server (home_stats in schema.sql)
+    final stats = await supa.rpc('home_stats', params: {'p_days': 30}).single();
 
+    if (!mounted) return;
     setState(() {
-      followerCount = (followersResp as List).length;
-      newCount = (eventsResp as List).where((e) => e['type'] == 'follow').length;
-      lostCount = (eventsResp as List).where((e) => e['type'] == 'unfollow').length;
+      followerCount = stats['follower_count'] as int;
+      newCount = stats['follow_count'] as int;
+      lostCount = stats['unfollow_count'] as int;
+      recentNew = stats['recent_follows'] as int;
+      recentLost = stats['recent_unfollows'] as int;
       loading = false;
     });
   }
@@ -294,7 +312,7 @@ class _HomePageState extends State<HomePage> {
 
     return Scaffold(
       appBar: AppBar(
-        title: const Text('Insta Diff'),
+        title: const Text('{{app_title}}'),
         actions: [
           IconButton(
             tooltip: 'Sair',
@@ -340,6 +358,13 @@ class _HomePageState extends State<HomePage> {
                       ),
                     ],
                   ),
+                  const SizedBox(height: 12),
+                  Card(
+                    child: ListTile(
+                      title: const Text('Últimos 30 dias'),
+                      trailing: Text('+$recentNew / -$recentLost', style: const TextStyle(fontSize: 20, fontWeight: FontWeight.bold)),
+                    ),
+                  ),
                   const SizedBox(height: 16),
                   SizedBox(
                     width: double.infinity,
@@ -373,12 +398,14 @@ class _HomePageState extends State<HomePage> {
 
 # lib/pages/upload_page.dart
 upload_page = r"""
-import 'dart:io';
+import 'dart:isolate';
 import 'package:flutter/material.dart';
 import 'package:file_picker/file_picker.dart';
-import 'package:archive/archive_io.dart';
-import 'package:path/path.dart' as p;
+import 'package:flutter_dotenv/flutter_dotenv.dart';
 import 'package:supabase_flutter/supabase_flutter.dart';
+import '../services/import_trace.dart';
+import '../services/snapshot_cache.dart';
+import '../services/supabase_client.dart';
 import '../utils/parser.dart';
 
 class UploadPage extends StatefulWidget {
@@ -391,6 +418,18 @@ class UploadPage extends StatefulWidget {
 class _UploadPageState extends State<UploadPage> {
   String? _status;
   bool _working = false;
+  ParseJob? _job;
+
+  Future<void> _stage(SupabaseClient supa, List<Map<String, dynamic>> staged) {
+    return BatchWriter(supa).upsert(
+      'import_staging',
+      staged,
+      onConflict: 'import_id,username',
+      onProgress: (done, total) {
+        if (mounted) setState(() { _status = "Enviando seguidores... $done/$total"; });
+      },
+    );
+  }
 
   Future<void> _processFile() async {
     final res = await FilePicker.platform.pickFiles(
@@ -406,101 +445,129 @@ class _UploadPageState extends State<UploadPage> {
     final supa = Supabase.instance.client;
     final uid = supa.auth.currentUser!.id;
 
-    List<String> usernames = [];
-
     final path = res.files.single.path!;
-    final ext = p.extension(path).toLowerCase();
+    final trace = ImportTrace();
 
     try {
-      if (ext == '.zip') {
-        final inputStream = InputFileStream(path);
-        final archive = ZipDecoder().decodeBuffer(inputStream);
-        usernames = await InstagramExportParser.extractFollowersFromArchive(archive);
-      } else if (ext == '.json' || ext == '.csv') {
-        usernames = await InstagramExportParser.extractFollowersFromFile(File(path));
-      } else {
-        throw Exception("Formato não suportado");
-      }
+      // ZIP/JSON/CSV decoding, parsing and dedup run in a worker isolate
+      final usernames = await trace.span('parse', (span) async {
+        final job = InstagramExportParser.parseInBackground(path);
+        setState(() { _job = job; });
+        final progressSub = job.progress.listen((p) {
+          span.bytes = p.bytesRead;
+          if (mounted) setState(() { _status = "Lendo arquivo... ${(p.bytesRead / (1024 * 1024)).toStringAsFixed(1)} MB, ${p.usernamesFound} seguidores"; });
+        });
+        try {
+          final result = await job.result;
+          span.rows = result.length;
+          return result;
+        } finally {
+          await progressSub.cancel();
+          // Hides the Cancel button as soon as parsing ends, successfully or not
+          if (mounted) setState(() { _job = null; });
+        }
+      });
 
-      usernames = usernames.map((e) => e.trim().toLowerCase()).where((e) => e.isNotEmpty).toSet().toList();
       setState(() { _status = "Encontrados ${usernames.length} seguidores. Gravando snapshot..."; });
 
+      // A cached snapshot of the latest import lets us send only who entered/left
+      final cache = await SnapshotCache.forUser(uid);
+      final cached = await trace.span('cache_check', (span) async {
+        final snapshot = await cache.readIfCurrent(supa);
+        span.rows = snapshot?.usernames.length;
+        return snapshot;
+      });
+
       // Create an import record
-      final importResp = await supa.from('imports').insert({
-        'user_id': uid,
-        'source': 'instagram_export',
-      }).select().single();
-
-      final importId = importResp['id'] as int;
-
-      // Load previous followers
-      final currentFollowers = await supa
-          .from('followers')
-          .select('username')
-          .eq('user_id', uid);
-
-      final prev = (currentFollowers as List).map((e) => e['username'] as String).toSet();
-      final now = usernames.toSet();
-
-      final entered = now.difference(prev).toList();
-      final left = prev.difference(now).toList();
-
-      // Upsert followers table
-      final toUpsert = now.map((u) => {
-        'user_id': uid,
-        'username': u,
-        'first_seen': DateTime.now().toIso8601String(),
-        'last_seen': DateTime.now().toIso8601String(),
-        'last_status': 'current',
-      }).toList();
-
-      // Mark left as last_status=left and update last_seen
-      final updates = left.map((u) => {
-        'user_id': uid,
-        'username': u,
-        'last_seen': DateTime.now().toIso8601String(),
-        'last_status': 'left',
-      }).toList();
-
-      if (toUpsert.isNotEmpty) {
-        await supa.from('followers').upsert(toUpsert, onConflict: 'user_id,username');
-      }
-      for (final upd in updates) {
-        await supa.from('followers').update({
-          'last_seen': upd['last_seen'],
-          'last_status': 'left',
-        }).match({'user_id': uid, 'username': upd['username']});
+      final importId = await trace.span('create_import', (span) async {
+        final importResp = await supa.from('imports').insert({
+          'user_id': uid,
+          'source': 'instagram_export',
+        }).select().single();
+        span.rows = 1;
+        return importResp['id'] as int;
+      });
+      trace.importId = importId;
+
+      Map<String, dynamic>? result;
+      if (cached != null) {
+        final delta = await trace.span('diff', (span) async {
+          final prev = cached.usernames;
+          final changes = await Isolate.run(() => SnapshotDelta.compute(prev, usernames));
+          span.rows = changes.entered.length + changes.left.length;
+          return changes;
+        });
+
+        await trace.span('stage_upload', (span) async {
+          final staged = [
+            for (final u in delta.entered) {'import_id': importId, 'user_id': uid, 'username': u, 'change': 'enter'},
+            for (final u in delta.left) {'import_id': importId, 'user_id': uid, 'username': u, 'change': 'leave'},
+          ];
+          span.rows = staged.length;
+          await _stage(supa, staged);
+        });
+
+        try {
+          result = await trace.span('finalize', (span) async {
+            final counts = await supa
+                .rpc('finalize_import_delta', params: {'p_import_id': importId, 'p_base_import_id': cached.importId})
+                .single();
+            span.rows = (counts['entered_count'] as int) + (counts['left_count'] as int);
+            return counts;
+          });
+        } on PostgrestException catch (e) {
+          if (e.code != 'IG001') rethrow;
+          // Another import was finalized since the cache check: send the full list instead
+          await supa.from('import_staging').delete().eq('import_id', importId);
+        }
       }
 
-      // Insert events
-      final eventRows = [
-        ...entered.map((u) => {
-              'user_id': uid,
-              'username': u,
-              'type': 'follow',
-              'happened_at': DateTime.now().toIso8601String(),
-              'import_id': importId,
-            }),
-        ...left.map((u) => {
-              'user_id': uid,
-              'username': u,
-              'type': 'unfollow',
-              'happened_at': DateTime.now().toIso8601String(),
-              'import_id': importId,
-            }),
-      ];
-
-      if (eventRows.isNotEmpty) {
-        await supa.from('events').insert(eventRows);
+      if (result == null) {
+        // Stage the new list once; the diff against the previous snapshot runs server-side
+        await trace.span('stage_upload', (span) async {
+          final staged = usernames.map((u) => {
+            'import_id': importId,
+            'user_id': uid,
+            'username': u,
+          }).toList();
+          span.rows = staged.length;
+          await _stage(supa, staged);
+        });
+
+        // Entered/left, events and followers upsert in one transaction (see schema.sql)
+        result = await trace.span('finalize', (span) async {
+          final counts = await supa
+              .rpc('finalize_import', params: {'p_import_id': importId})
+              .single();
+          span.rows = (counts['entered_count'] as int) + (counts['left_count'] as int);
+          return counts;
+        });
       }
 
+      // Best effort: a missing cache only means the next upload sends the full list
+      try {
+        await trace.span('cache_write', (span) async {
+          span.rows = usernames.length;
+          await cache.write(importId, usernames);
+        });
+      } catch (_) {}
+
       setState(() {
-        _status = "Processo concluído. Entraram: ${entered.length} | Saíram: ${left.length}";
+        _status = "Processo concluído. Entraram: ${result['entered_count']} | Saíram: ${result['left_count']}";
       });
 
+    } on ParseCancelledException {
+      setState(() { _status = "Leitura cancelada."; });
     } catch (e) {
       setState(() { _status = "Erro: $e"; });
     } finally {
+      trace.log();
+      if (dotenv.env['IMPORT_METRICS'] == 'true') {
+        // Metrics are best effort: never turn a finished import into an error
+        try {
+          await trace.store(supa);
+        } catch (_) {}
+      }
       setState(() { _working = false; });
     }
   }
@@ -524,6 +591,17 @@ class _UploadPageState extends State<UploadPage> {
                 label: const Text("Selecionar arquivo"),
               ),
             ),
+            if (_job != null) ...[
+              const SizedBox(height: 8),
+              SizedBox(
+                width: double.infinity,
+                child: OutlinedButton.icon(
+                  onPressed: () => _job?.cancel(),
+                  icon: const Icon(Icons.close),
+                  label: const Text("Cancelar"),
+                ),
+              ),
+            ],
             const SizedBox(height: 16),
             if (_status != null) Text(_status!),
           ],
@@ -539,6 +617,18 @@ diff_page = r"""
 import 'package:flutter/material.dart';
 import 'package:supabase_flutter/supabase_flutter.dart';
 
+/// Estado de paginação por tipo de evento (keyset em happened_at, id).
+class _EventPager {
+  _EventPager(this.type);
+
+  final String type;
+  final List<Map<String, dynamic>> items = [];
+  String? cursorAt;
+  int? cursorId;
+  bool loading = false;
+  bool done = false;
+}
+
 class DiffPage extends StatefulWidget {
   const DiffPage({super.key});
 
@@ -547,68 +637,104 @@ class DiffPage extends StatefulWidget {
 }
 
 class _DiffPageState extends State<DiffPage> {
-  List<Map<String, dynamic>> entered = [];
-  List<Map<String, dynamic>> left = [];
-  bool loading = true;
+  static const _pageSize = 50;
+
+  final entered = _EventPager('follow');
+  final left = _EventPager('unfollow');
 
   @override
   void initState() {
     super.initState();
-    _load();
+    _loadMore(entered);
+    _loadMore(left);
   }
 
-  Future<void> _load() async {
+  Future<void> _loadMore(_EventPager pager) async {
+    if (pager.loading || pager.done) return;
+    setState(() => pager.loading = true);
+
     final supa = Supabase.instance.client;
     final uid = supa.auth.currentUser!.id;
 
-    final events = await supa
-        .from('events')
-        .select('username,type,happened_at')
-        .eq('user_id', uid)
-        .order('happened_at', ascending: false);
+    try {
+      var query = supa
+          .from('events')
+          .select('id,username,type,happened_at')
+          .eq('user_id', uid)
+          .eq('type', pager.type);
+      if (pager.cursorAt != null) {
+        // Next page: rows strictly after the last (happened_at, id) seen, newest first
+        final at = pager.cursorAt;
+        query = query.or('happened_at.lt."$at",and(happened_at.eq."$at",id.lt.${pager.cursorId})');
+      }
+      final rows = await query
+          .order('happened_at', ascending: false)
+          .order('id', ascending: false)
+          .limit(_pageSize);
 
-    setState(() {
-      entered = (events as List).where((e) => e['type'] == 'follow').cast<Map<String, dynamic>>().toList();
-      left = (events as List).where((e) => e['type'] == 'unfollow').cast<Map<String, dynamic>>().toList();
-      loading = false;
-    });
+      final page = (rows as List).cast<Map<String, dynamic>>();
+      setState(() {
+        pager.items.addAll(page);
+        if (page.isNotEmpty) {
+          pager.cursorAt = page.last['happened_at'] as String;
+          pager.cursorId = page.last['id'] as int;
+        }
+        pager.done = page.length < _pageSize;
+      });
+    } catch (e) {
+      // Stop paging this tab instead of retrying on every frame
+      pager.done = true;
+      if (mounted) {
+        ScaffoldMessenger.of(context).showSnackBar(SnackBar(content: Text("Erro: $e")));
+      }
+    } finally {
+      if (mounted) setState(() => pager.loading = false);
+    }
   }
 
   @override
   Widget build(BuildContext context) {
     return Scaffold(
       appBar: AppBar(title: const Text("Mudanças")),
-      body: loading
-          ? const Center(child: CircularProgressIndicator())
-          : DefaultTabController(
-              length: 2,
-              child: Column(
+      body: DefaultTabController(
+        length: 2,
+        child: Column(
+          children: [
+            const TabBar(tabs: [
+              Tab(text: "Entraram"),
+              Tab(text: "Saíram"),
+            ]),
+            Expanded(
+              child: TabBarView(
                 children: [
-                  const TabBar(tabs: [
-                    Tab(text: "Entraram"),
-                    Tab(text: "Saíram"),
-                  ]),
-                  Expanded(
-                    child: TabBarView(
-                      children: [
-                        _list(entered),
-                        _list(left),
-                      ],
-                    ),
-                  )
+                  _list(entered),
+                  _list(left),
                 ],
               ),
-            ),
+            )
+          ],
+        ),
+      ),
     );
   }
 
-  Widget _list(List<Map<String, dynamic>> items) {
+  Widget _list(_EventPager pager) {
+    final items = pager.items;
     if (items.isEmpty) {
+      if (!pager.done) return const Center(child: CircularProgressIndicator());
       return const Center(child: Text("Sem eventos ainda. Faça upload de um arquivo."));
     }
     return ListView.separated(
-      itemCount: items.length,
+      itemCount: items.length + (pager.done ? 0 : 1),
       itemBuilder: (context, i) {
+        if (i >= items.length) {
+          // Last row visible: fetch the next page once this frame is done
+          WidgetsBinding.instance.addPostFrameCallback((_) => _loadMore(pager));
+          return const Padding(
+            padding: EdgeInsets.all(16),
+            child: Center(child: CircularProgressIndicator()),
+          );
+        }
         final e = items[i];
         return ListTile(
           title: Text(e['username'] ?? ''),
@@ -623,62 +749,318 @@ class _DiffPageState extends State<DiffPage> {
 
 # lib/utils/parser.dart
 parser_dart = r"""
+import 'dart:async';
 import 'dart:convert';
 import 'dart:io';
-import 'package:archive/archive.dart';
+import 'dart:isolate';
+import 'package:archive/archive_io.dart';
+
+typedef ParseProgressCallback = void Function(int bytesRead, int usernamesFound);
+
+/// Progresso enviado pelo isolate de parsing.
+class ParseProgress {
+  const ParseProgress(this.bytesRead, this.usernamesFound);
+
+  final int bytesRead;
+  final int usernamesFound;
+}
+
+class ParseCancelledException implements Exception {
+  @override
+  String toString() => "Leitura cancelada.";
+}
+
+class ParseException implements Exception {
+  ParseException(this.message);
+
+  final String message;
+
+  @override
+  String toString() => message;
+}
+
+/// Parsing em andamento num isolate separado: [progress] emite o andamento,
+/// [result] completa com os usernames normalizados e sem duplicatas.
+class ParseJob {
+  ParseJob._(this.progress, this.result, this._cancel);
+
+  final Stream<ParseProgress> progress;
+  final Future<List<String>> result;
+  final void Function() _cancel;
+
+  void cancel() => _cancel();
+}
+
+class _ParseOutcome {
+  const _ParseOutcome(this.usernames, this.error);
+
+  final List<String>? usernames;
+  final String? error;
+}
+
+Future<void> _parseWorker(List<Object> args) async {
+  final send = args[0] as SendPort;
+  final path = args[1] as String;
+  try {
+    final usernames = await InstagramExportParser.extractFollowersFromPath(
+      path,
+      onProgress: (bytes, found) => send.send(ParseProgress(bytes, found)),
+    );
+    final unique = usernames.map((e) => e.trim().toLowerCase()).where((e) => e.isNotEmpty).toSet().toList();
+    // Isolate.exit hands the list over without copying it
+    Isolate.exit(send, _ParseOutcome(unique, null));
+  } catch (e) {
+    Isolate.exit(send, _ParseOutcome(null, e.toString()));
+  }
+}
+
+/// Agrupa as notificações de progresso para não inundar a porta do isolate.
+class _ProgressReporter {
+  _ProgressReporter(this.callback);
+
+  static const _every = 2000;
+
+  final ParseProgressCallback? callback;
+  int bytesRead = 0;
+  int found = 0;
+
+  void bytes(int total) {
+    bytesRead = total;
+    callback?.call(bytesRead, found);
+  }
+
+  void username() {
+    if (++found % _every == 0) callback?.call(bytesRead, found);
+  }
+
+  /// Parte concluída noutro isolate.
+  void part(int bytes, int usernames) {
+    bytesRead += bytes;
+    found += usernames;
+    callback?.call(bytesRead, found);
+  }
+
+  void done() => callback?.call(bytesRead, found);
+}
 
 class InstagramExportParser {
-  /// Tenta extrair a lista de seguidores de um ZIP de exportação oficial.
-  static Future<List<String>> extractFollowersFromArchive(Archive archive) async {
-    // Possíveis caminhos do JSON/CSV nos exports (vários formatos ao longo do tempo)
-    final candidates = [
-      // JSONs comuns
-      RegExp(r'followers_.*\.json$', caseSensitive: false),
-      RegExp(r'followers\.json$', caseSensitive: false),
-      // CSV
-      RegExp(r'followers_.*\.csv$', caseSensitive: false),
-      RegExp(r'followers\.csv$', caseSensitive: false),
-      // Alguns exports usam "connections" ou "followers_and_following"
-      RegExp(r'connections/followers_.*\.json$', caseSensitive: false),
-      RegExp(r'connections/followers\.json$', caseSensitive: false),
-    ];
+  /// Executa [extractFollowersFromPath] num worker isolate, sem bloquear a UI.
+  static ParseJob parseInBackground(String path) {
+    final port = ReceivePort();
+    final progress = StreamController<ParseProgress>.broadcast();
+    final result = Completer<List<String>>();
+    Isolate? isolate;
+    var cancelled = false;
+
+    void finish() {
+      port.close();
+      progress.close();
+    }
 
-    for (final file in archive) {
-      final name = file.name.replaceAll("\\", "/");
-      if (file.isFile && candidates.any((rx) => rx.hasMatch(name))) {
-        final data = file.content as List<int>;
-        if (name.toLowerCase().endsWith('.json')) {
-          return _parseFollowersJson(utf8.decode(data));
-        } else if (name.toLowerCase().endsWith('.csv')) {
-          return _parseFollowersCsv(utf8.decode(data));
+    port.listen((msg) {
+      if (msg is ParseProgress) {
+        if (!progress.isClosed) progress.add(msg);
+      } else if (msg is _ParseOutcome) {
+        if (!result.isCompleted) {
+          if (msg.error != null) {
+            result.completeError(ParseException(msg.error!));
+          } else {
+            result.complete(msg.usernames!);
+          }
         }
+        finish();
+      } else if (msg is List) {
+        // Uncaught error reported by onError: [message, stackTrace]
+        if (!result.isCompleted) result.completeError(ParseException(msg.first.toString()));
+      } else if (msg == null) {
+        // onExit without an outcome: the isolate was killed
+        if (!result.isCompleted) result.completeError(ParseCancelledException());
+        finish();
+      }
+    });
+
+    Isolate.spawn(
+      _parseWorker,
+      <Object>[port.sendPort, path],
+      onError: port.sendPort,
+      onExit: port.sendPort,
+    ).then((spawned) {
+      isolate = spawned;
+      if (cancelled) spawned.kill(priority: Isolate.immediate);
+    }, onError: (Object e) {
+      if (!result.isCompleted) result.completeError(e);
+      finish();
+    });
+
+    return ParseJob._(progress.stream, result.future, () {
+      if (result.isCompleted) return;
+      cancelled = true;
+      isolate?.kill(priority: Isolate.immediate);
+      result.completeError(ParseCancelledException());
+      finish();
+    });
+  }
+
+  // Um único padrão pré-compilado, aplicado ao último segmento do nome:
+  // grupo 1 = followers(_N).json/csv, grupo 2 = *following*.json/csv (fallback)
+  static final _memberPattern = RegExp(
+    r'(?:^|/)(?:(followers(?:_[^/]*)?)|([^/]*following[^/]*))\.(json|csv)$',
+    caseSensitive: false,
+  );
+
+  static final _partNumber = RegExp(r'_(\d+)\.(json|csv)$', caseSensitive: false);
+
+  /// Membros a extrair (numa única passada pelos nomes): todas as partes
+  /// followers(_N), em ordem de parte, ou o primeiro following como fallback.
+  static List<int> _selectMembers(List<String> names) {
+    final parts = <int>[];
+    var fallback = -1;
+    for (var i = 0; i < names.length; i++) {
+      final m = _memberPattern.firstMatch(names[i].replaceAll("\\", "/"));
+      if (m == null) continue;
+      if (m.group(1) != null) {
+        parts.add(i);
+      } else if (fallback < 0 && m.group(3)!.toLowerCase() == 'json') {
+        // Fallback: following, caso o usuário queira comparar "quem eu sigo"
+        fallback = i;
       }
     }
+    if (parts.isEmpty) return fallback < 0 ? const [] : [fallback];
+    int number(int i) => int.parse(_partNumber.firstMatch(names[i])?.group(1) ?? '0');
+    parts.sort((a, b) {
+      final byNumber = number(a).compareTo(number(b));
+      return byNumber != 0 ? byNumber : names[a].compareTo(names[b]);
+    });
+    return parts;
+  }
+
+  /// Extrai de um caminho ZIP, JSON ou CSV.
+  static Future<List<String>> extractFollowersFromPath(String path, {ParseProgressCallback? onProgress}) async {
+    final lower = path.toLowerCase();
+    if (lower.endsWith('.zip')) {
+      final input = InputFileStream(path);
+      var selected = <ZipFileHeader>[];
+      try {
+        // Só o diretório central é lido; apenas os membros escolhidos são descomprimidos
+        final directory = ZipDirectory.read(input);
+        final headers = directory.fileHeaders.where((h) => !h.filename.endsWith('/')).toList();
+        selected = [for (final i in _selectMembers([for (final h in headers) h.filename])) headers[i]];
+        if (selected.isEmpty) throw Exception("Não encontrei arquivo de seguidores no ZIP.");
+        if (selected.length == 1) {
+          return _parseMember(selected.single.filename, selected.single.file!.content, _ProgressReporter(onProgress));
+        }
+      } finally {
+        await input.close();
+      }
 
-    // Fallback: tentar following caso o usuário queira comparar "que eu sigo"
-    for (final file in archive) {
-      final name = file.name.replaceAll("\\", "/");
-      if (file.isFile && name.toLowerCase().contains('following') && name.toLowerCase().endsWith('.json')) {
-        final data = file.content as List<int>;
-        return _parseFollowersJson(utf8.decode(data));
+      // followers_1.json, followers_2.json, ...: uma parte por isolate, no máximo um
+      // isolate por núcleo, para não manter todas as partes descomprimidas de uma vez
+      final progress = _ProgressReporter(onProgress);
+      final parts = List<List<String>>.filled(selected.length, const []);
+      var next = 0;
+
+      Future<void> worker() async {
+        while (next < selected.length) {
+          final i = next++;
+          parts[i] = await _parsePartInIsolate(path, selected[i].filename);
+          progress.part(selected[i].uncompressedSize ?? 0, parts[i].length);
+        }
       }
+
+      final cores = Platform.numberOfProcessors;
+      await Future.wait([for (var i = 0; i < (selected.length < cores ? selected.length : cores); i++) worker()]);
+      return [for (final part in parts) ...part];
+    } else if (lower.endsWith('.json') || lower.endsWith('.csv')) {
+      return extractFollowersFromFile(File(path), onProgress: onProgress);
+    }
+    throw Exception("Formato não suportado");
+  }
+
+  static Future<List<String>> _parsePartInIsolate(String path, String name) {
+    return Isolate.run(() => _parsePart(path, name));
+  }
+
+  static Future<List<String>> _parsePart(String path, String name) async {
+    final input = InputFileStream(path);
+    try {
+      final header = ZipDirectory.read(input).fileHeaders.firstWhere((h) => h.filename == name);
+      return _parseMember(name, header.file!.content, _ProgressReporter(null));
+    } finally {
+      await input.close();
     }
+  }
+
+  /// Tenta extrair a lista de seguidores de um ZIP de exportação oficial.
+  static Future<List<String>> extractFollowersFromArchive(Archive archive, {ParseProgressCallback? onProgress}) async {
+    final files = archive.files.where((f) => f.isFile).toList();
+    final selected = _selectMembers([for (final f in files) f.name]);
+    if (selected.isEmpty) throw Exception("Não encontrei arquivo de seguidores no ZIP.");
+    final progress = _ProgressReporter(onProgress);
+    return [
+      for (final i in selected) ..._parseMember(files[i].name, files[i].content as List<int>, progress),
+    ];
+  }
 
-    throw Exception("Não encontrei arquivo de seguidores no ZIP.");
+  static List<String> _parseMember(String name, List<int> data, _ProgressReporter progress) {
+    progress.bytes(data.length);
+    if (name.toLowerCase().endsWith('.csv')) {
+      return _parseFollowersCsv(data, progress);
+    }
+    return _parseFollowersJson(data, progress);
   }
 
   /// Extrai de um arquivo solto (JSON ou CSV)
-  static Future<List<String>> extractFollowersFromFile(File file) async {
-    final content = await file.readAsString();
-    if (file.path.toLowerCase().endsWith('.json')) {
-      return _parseFollowersJson(content);
-    } else if (file.path.toLowerCase().endsWith('.csv')) {
-      return _parseFollowersCsv(content);
+  static Future<List<String>> extractFollowersFromFile(File file, {ParseProgressCallback? onProgress}) async {
+    final progress = _ProgressReporter(onProgress);
+    final lower = file.path.toLowerCase();
+    if (lower.endsWith('.csv')) {
+      // CSV: os bytes vão direto para o tokenizador, bloco a bloco
+      final rows = _CsvFollowerRows(progress);
+      final tokenizer = _CsvTokenizer(rows.add);
+      var read = 0;
+      await for (final chunk in file.openRead()) {
+        tokenizer.add(chunk);
+        progress.bytes(read += chunk.length);
+      }
+      tokenizer.close();
+      progress.done();
+      return rows.usernames;
+    } else if (lower.endsWith('.json')) {
+      // JSON: idem, o scanner consome os blocos sem montar string nem árvore
+      final scanner = _JsonFollowerScanner(progress);
+      var read = 0;
+      await for (final chunk in file.openRead()) {
+        scanner.add(chunk);
+        progress.bytes(read += chunk.length);
+      }
+      progress.done();
+      return scanner.usernames;
     }
     throw Exception("Formato não suportado (apenas JSON/CSV/ZIP).");
   }
 
-  static List<String> _parseFollowersJson(String content) {
+  /// Usernames de um JSON de export, direto dos bytes (ver [_JsonFollowerScanner]).
+  static List<String> parseFollowersJsonBytes(List<int> bytes) => _parseFollowersJson(bytes);
+
+  /// Idem, com os bytes em blocos como chegam de File.openRead (usado em test/parser_test.dart).
+  static List<String> parseFollowersJsonChunks(Iterable<List<int>> chunks) {
+    final scanner = _JsonFollowerScanner(null);
+    for (final chunk in chunks) {
+      scanner.add(chunk);
+    }
+    return scanner.usernames;
+  }
+
+  static List<String> _parseFollowersJson(List<int> bytes, [_ProgressReporter? progress]) {
+    final scanner = _JsonFollowerScanner(progress)..add(bytes);
+    progress?.done();
+    return scanner.usernames;
+  }
+
+  /// Implementação anterior (json.decode + Uri.tryParse), mantida como referência
+  /// para benchmark/parser_benchmark.dart e test/parser_test.dart; não usa o
+  /// caminho rápido de [_usernameFromHref].
+  static List<String> parseFollowersJsonDom(String content) {
     final data = json.decode(content);
     final List<String> usernames = [];
 
@@ -688,9 +1070,10 @@ class InstagramExportParser {
         if (item is Map && item['string_list_data'] is List && item['string_list_data'].isNotEmpty) {
           final first = item['string_list_data'][0];
           if (first is Map && first['href'] is String) {
-            final href = first['href'] as String;
-            final u = _usernameFromHref(href);
-            if (u != null) usernames.add(u);
+            // Ex.: https://www.instagram.com/username/
+            final uri = Uri.tryParse(first['href'] as String);
+            final segments = uri?.pathSegments.where((s) => s.isNotEmpty).toList() ?? const <String>[];
+            if (segments.isNotEmpty) usernames.add(segments.first.toLowerCase());
           } else if (first is Map && first['value'] is String) {
             usernames.add((first['value'] as String).toLowerCase());
           }
@@ -709,23 +1092,40 @@ class InstagramExportParser {
     return usernames;
   }
 
-  static List<String> _parseFollowersCsv(String content) {
-    final lines = const LineSplitter().convert(content);
-    final usernames = <String>[];
-    for (var i = 1; i < lines.length; i++) {
-      final row = lines[i].split(',');
-      if (row.isNotEmpty) {
-        final candidate = row[0].replaceAll('"', '').trim();
-        if (candidate.isNotEmpty) {
-          usernames.add(candidate.toLowerCase());
-        }
-      }
-    }
-    return usernames;
+  static List<String> _parseFollowersCsv(List<int> bytes, [_ProgressReporter? progress]) {
+    final rows = _CsvFollowerRows(progress);
+    final tokenizer = _CsvTokenizer(rows.add)..add(bytes);
+    tokenizer.close();
+    progress?.done();
+    return rows.usernames;
   }
 
   static String? _usernameFromHref(String href) {
     // Ex.: https://www.instagram.com/username/
+    // Caminho rápido: fatia o primeiro segmento do path, sem montar um Uri
+    final scheme = href.indexOf('://');
+    var start = scheme < 0 ? 0 : href.indexOf('/', scheme + 3);
+    if (start < 0) return null;
+    while (start < href.length && href.codeUnitAt(start) == 0x2F) {
+      start++;
+    }
+    var end = start;
+    var plain = true;
+    while (end < href.length) {
+      final c = href.codeUnitAt(end);
+      if (c == 0x2F || c == 0x3F || c == 0x23) break; // / ? #
+      // Só letras, dígitos, '.', '_' e '-' (como os usernames do Instagram)
+      plain = plain &&
+          ((c >= 0x61 && c <= 0x7A) || (c >= 0x41 && c <= 0x5A) || (c >= 0x30 && c <= 0x39) || c == 0x2E || c == 0x5F || c == 0x2D);
+      end++;
+    }
+    if (end == start) return null;
+    // Escapes (%xx), espaços ou outros caracteres: deixa o parse completo decidir
+    if (!plain) return _usernameFromUri(href);
+    return href.substring(start, end).toLowerCase();
+  }
+
+  static String? _usernameFromUri(String href) {
     final uri = Uri.tryParse(href);
     if (uri == null) return null;
     final segments = uri.pathSegments.where((s) => s.isNotEmpty).toList();
@@ -733,11 +1133,831 @@ class InstagramExportParser {
     return segments.first.toLowerCase();
   }
 }
+
+/// Tokenizador CSV (RFC 4180) incremental sobre bytes: campos entre aspas podem
+/// conter vírgulas, quebras de linha e aspas duplicadas (""). Cada linha
+/// completa é entregue a [onRow] assim que termina, sem montar a lista de linhas.
+class _CsvTokenizer {
+  _CsvTokenizer(this.onRow);
+
+  static const _comma = 0x2C, _quote = 0x22, _cr = 0x0D, _lf = 0x0A;
+  static const _bom = [0xEF, 0xBB, 0xBF];
+  static const _fieldStart = 0, _unquoted = 1, _inQuotes = 2, _quoteInQuotes = 3;
+
+  final void Function(List<String> row) onRow;
+  final _field = <int>[];
+  var _row = <String>[];
+  var _state = _fieldStart;
+  var _skipLf = false;
+  var _seen = 0;
+
+  void add(List<int> bytes) {
+    for (final b in bytes) {
+      if (_seen < _bom.length) {
+        // UTF-8 BOM no início do arquivo
+        if (b == _bom[_seen]) {
+          _seen++;
+          continue;
+        }
+        _seen = _bom.length;
+      }
+      if (_skipLf) {
+        _skipLf = false;
+        if (b == _lf) continue;
+      }
+      if (_state == _inQuotes) {
+        if (b == _quote) {
+          _state = _quoteInQuotes;
+        } else {
+          _field.add(b);
+        }
+        continue;
+      }
+      if (_state == _quoteInQuotes) {
+        if (b == _quote) {
+          _field.add(b);
+          _state = _inQuotes;
+          continue;
+        }
+        _state = _unquoted;
+      }
+      if (b == _comma) {
+        _endField();
+      } else if (b == _lf || b == _cr) {
+        _endRow();
+        _skipLf = b == _cr;
+      } else if (b == _quote && _state == _fieldStart) {
+        _state = _inQuotes;
+      } else {
+        _field.add(b);
+        _state = _unquoted;
+      }
+    }
+  }
+
+  void close() {
+    if (_state != _fieldStart || _field.isNotEmpty || _row.isNotEmpty) _endRow();
+  }
+
+  void _endField() {
+    _row.add(utf8.decode(_field, allowMalformed: true));
+    _field.clear();
+    _state = _fieldStart;
+  }
+
+  void _endRow() {
+    _endField();
+    final row = _row;
+    _row = <String>[];
+    // Linhas em branco
+    if (row.length == 1 && row.first.isEmpty) return;
+    onRow(row);
+  }
+}
+
+/// Consome as linhas do tokenizador: a primeira é o cabeçalho, usado para
+/// achar a coluna do username (ou de um link de perfil).
+class _CsvFollowerRows {
+  _CsvFollowerRows(this.progress);
+
+  static const _usernameHeaders = {
+    'username', 'user_name', 'user name', 'usuario', 'usuário', 'nome de usuário', 'nome_de_usuario',
+  };
+
+  final _ProgressReporter? progress;
+  final usernames = <String>[];
+  int? _column;
+  var _fromHref = false;
+
+  void add(List<String> row) {
+    final column = _column;
+    if (column == null) {
+      _useHeader(row);
+      return;
+    }
+    if (column >= row.length) return;
+    final value = row[column].trim();
+    final candidate = _fromHref ? InstagramExportParser._usernameFromHref(value) : value.toLowerCase();
+    if (candidate != null && candidate.isNotEmpty) {
+      usernames.add(candidate);
+      progress?.username();
+    }
+  }
+
+  void _useHeader(List<String> header) {
+    final names = [for (final h in header) h.trim().toLowerCase()];
+    var column = names.indexWhere(_usernameHeaders.contains);
+    if (column < 0) {
+      column = names.indexWhere((n) => n.contains('href') || n.contains('url') || n.contains('link'));
+      _fromHref = column >= 0;
+    }
+    _column = column < 0 ? 0 : column;
+  }
+}
+
+class _JsonFrame {
+  _JsonFrame(this.isObject);
+
+  final bool isObject;
+  String? key;
+  int count = 0;
+  bool isStringListData = false;
+}
+
+/// Extrai usernames de um JSON de export direto dos bytes, sem montar a árvore.
+/// Um tokenizador incremental acompanha só os caminhos conhecidos
+/// (`[].string_list_data[0].href/value`, `[].username`, `{followers: [].username}`)
+/// e só guarda os textos desses campos; o resto é apenas percorrido.
+class _JsonFollowerScanner {
+  _JsonFollowerScanner(this.progress);
+
+  static const _quote = 0x22, _backslash = 0x5C, _comma = 0x2C, _colon = 0x3A;
+  static const _lbrace = 0x7B, _rbrace = 0x7D, _lbracket = 0x5B, _rbracket = 0x5D;
+
+  final _ProgressReporter? progress;
+  final usernames = <String>[];
+
+  final _stack = <_JsonFrame>[];
+  var _expectKey = false;
+
+  // String em andamento
+  var _inString = false;
+  var _escape = false;
+  var _hadEscape = false;
+  var _isKey = false;
+  List<int>? _capture;
+
+  var _inScalar = false;
+
+  // Profundidade (tamanho da pilha) do array de itens, do objeto item e do
+  // primeiro objeto de string_list_data; -1 quando não se aplica
+  var _itemsDepth = -1;
+  var _mapShape = false;
+  var _firstDepth = -1;
+
+  // Campos do item corrente
+  var _sldNonEmpty = false;
+  String? _href;
+  String? _value;
+  String? _username;
+
+  void add(List<int> bytes) {
+    for (final b in bytes) {
+      if (_inString) {
+        if (_escape) {
+          _escape = false;
+          _capture?.add(b);
+        } else if (b == _backslash) {
+          _escape = true;
+          _hadEscape = true;
+          _capture?.add(b);
+        } else if (b == _quote) {
+          _inString = false;
+          _endString();
+        } else {
+          _capture?.add(b);
+        }
+        continue;
+      }
+      if (_inScalar) {
+        if (b == _comma || b == _rbrace || b == _rbracket || b <= 0x20) {
+          _inScalar = false;
+        } else {
+          continue;
+        }
+      }
+      switch (b) {
+        case _quote:
+          _inString = true;
+          _hadEscape = false;
+          _isKey = _expectKey;
+          if (!_isKey) _valueStart(false);
+          _capture = (_isKey || _wantValue()) ? <int>[] : null;
+        case _lbrace:
+          _valueStart(true);
+          _startObject();
+        case _rbrace:
+          _endObject();
+        case _lbracket:
+          _valueStart(false);
+          _startArray();
+        case _rbracket:
+          _endArray();
+        case _comma:
+          _expectKey = _stack.isNotEmpty && _stack.last.isObject;
+        case _colon:
+          _expectKey = false;
+        default:
+          if (b > 0x20) {
+            _valueStart(false);
+            _inScalar = true;
+          }
+      }
+    }
+  }
+
+  void _valueStart(bool isObject) {
+    if (_stack.isEmpty) return;
+    final top = _stack.last;
+    if (top.isStringListData) {
+      if (top.count == 0) {
+        _sldNonEmpty = true;
+        if (isObject) _firstDepth = _stack.length + 1;
+      }
+    }
+    top.count++;
+  }
+
+  bool _wantValue() {
+    final depth = _stack.length;
+    final key = _stack.isEmpty ? null : _stack.last.key;
+    if (depth == _firstDepth) return key == 'href' || key == 'value';
+    if (_itemsDepth >= 0 && depth == _itemsDepth + 1) return key == 'username';
+    return false;
+  }
+
+  void _startObject() {
+    _stack.add(_JsonFrame(true));
+    _expectKey = true;
+    if (_itemsDepth >= 0 && _stack.length == _itemsDepth + 1) {
+      _sldNonEmpty = false;
+      _href = null;
+      _value = null;
+      _username = null;
+      _firstDepth = -1;
+    }
+  }
+
+  void _endObject() {
+    if (_stack.isEmpty) return;
+    if (_itemsDepth >= 0 && _stack.length == _itemsDepth + 1) _emitItem();
+    // Só o primeiro elemento de string_list_data conta
+    if (_stack.length == _firstDepth) _firstDepth = -1;
+    _stack.removeLast();
+    _expectKey = false;
+  }
+
+  void _startArray() {
+    final parent = _stack.isEmpty ? null : _stack.last;
+    final frame = _JsonFrame(false);
+    _stack.add(frame);
+    _expectKey = false;
+    if (parent == null) {
+      // [ {...}, ... ]
+      _itemsDepth = 1;
+    } else if (_stack.length == 2 && parent.isObject && parent.key == 'followers') {
+      // { "followers": [ {...}, ... ] }
+      _itemsDepth = 2;
+      _mapShape = true;
+    } else if (!_mapShape && _itemsDepth >= 0 && _stack.length == _itemsDepth + 2 && parent.key == 'string_list_data') {
+      frame.isStringListData = true;
+    }
+  }
+
+  void _endArray() {
+    if (_stack.isEmpty) return;
+    // Fim do array de itens: objetos dessa profundidade em outras chaves não são itens
+    if (_stack.length == _itemsDepth) _itemsDepth = -1;
+    _stack.removeLast();
+  }
+
+  void _endString() {
+    final captured = _capture;
+    _capture = null;
+    if (captured == null) return;
+    final text = _hadEscape ? json.decode('"${utf8.decode(captured, allowMalformed: true)}"') as String : utf8.decode(captured, allowMalformed: true);
+    if (_isKey) {
+      _stack.last.key = text;
+      return;
+    }
+    if (_stack.length == _firstDepth) {
+      if (_stack.last.key == 'href') {
+        _href ??= text;
+      } else {
+        _value ??= text;
+      }
+    } else {
+      _username ??= text;
+    }
+  }
+
+  void _emitItem() {
+    String? u;
+    if (!_mapShape && _sldNonEmpty) {
+      if (_href != null) {
+        u = InstagramExportParser._usernameFromHref(_href!);
+      } else if (_value != null) {
+        u = _value!.toLowerCase();
+      }
+    } else if (_username != null) {
+      u = _username!.toLowerCase();
+    }
+    if (u != null) {
+      usernames.add(u);
+      progress?.username();
+    }
+  }
+}
+"""
+
+# benchmark/parser_benchmark.dart
+parser_benchmark = r"""
+// Compara o parser de JSON anterior (json.decode + Uri) com o scanner incremental.
+// dart run benchmark/parser_benchmark.dart [seguidores]
+//
+// Com um caminho de export (ZIP/JSON/CSV), mede extractFollowersFromPath nele e
+// imprime uma linha JSON (usado por src/bench/run.py --dart-project).
+// dart run benchmark/parser_benchmark.dart export.zip
+import 'dart:convert';
+import 'dart:io';
+import 'package:{{package}}/utils/parser.dart';
+
+Future<void> main(List<String> args) async {
+  if (args.isNotEmpty && File(args.first).existsSync()) {
+    final sw = Stopwatch()..start();
+    final usernames = await InstagramExportParser.extractFollowersFromPath(args.first);
+    sw.stop();
+    print(jsonEncode({'parse_s': sw.elapsedMicroseconds / 1e6, 'usernames': usernames.length}));
+    return;
+  }
+
+  final n = args.isEmpty ? 200000 : int.parse(args.first);
+  final bytes = utf8.encode(jsonEncode([
+    for (var i = 0; i < n; i++)
+      {
+        'title': '',
+        'media_list_data': [],
+        'string_list_data': [
+          {'href': 'https://www.instagram.com/user_$i/', 'value': 'user_$i', 'timestamp': 1700000000 + i},
+        ],
+      },
+  ]));
+  print('$n seguidores, ${(bytes.length / (1024 * 1024)).toStringAsFixed(1)} MB');
+
+  final dom = _time('json.decode + Uri (anterior)', () => InstagramExportParser.parseFollowersJsonDom(utf8.decode(bytes)));
+  final scan = _time('scanner incremental', () => InstagramExportParser.parseFollowersJsonBytes(bytes));
+  if (dom.length != scan.length || dom.last != scan.last) {
+    throw StateError('resultados diferentes: ${dom.length} x ${scan.length}');
+  }
+}
+
+List<String> _time(String label, List<String> Function() run) {
+  run(); // aquecimento
+  final sw = Stopwatch();
+  late List<String> result;
+  const rounds = 5;
+  for (var i = 0; i < rounds; i++) {
+    sw.start();
+    result = run();
+    sw.stop();
+  }
+  print('$label: ${(sw.elapsedMilliseconds / rounds).toStringAsFixed(1)} ms');
+  return result;
+}
 """
 
-# lib/services/supabase_client.dart (optional helper)
+# test/parser_test.dart
+parser_test = r"""
+// O scanner incremental (parseFollowersJsonChunks) tem de devolver o mesmo que a
+// implementação anterior (parseFollowersJsonDom: json.decode + Uri.tryParse) em
+// qualquer documento e em qualquer corte dos bytes.
+// flutter test test/parser_test.dart
+import 'dart:convert';
+import 'dart:math';
+
+import 'package:flutter_test/flutter_test.dart';
+import 'package:{{package}}/utils/parser.dart';
+
+const _hrefs = [
+  'https://www.instagram.com/User_1/',
+  'https://www.instagram.com/user.2?igsh=abc',
+  'https://www.instagram.com//user3/',
+  'https://www.instagram.com/u6#top',
+  'https://www.instagram.com/_u%2E4/',
+  'https://www.instagram.com/Um%20Dois/',
+  'instagram.com/user5',
+  'https://www.instagram.com/',
+  'https://www.instagram.com',
+];
+const _scalars = <Object?>[1, 2.5, null, true, 'x,}]"\\', 'Ab', 'a\tb\n'];
+const _keys = ['href', 'value', 'username', 'k', 'string_list_data', 'followers'];
+
+Object? _value(Random rng, [int depth = 0]) {
+  final c = rng.nextDouble();
+  if (depth > 2 || c < 0.3) return _scalars[rng.nextInt(_scalars.length)];
+  if (c < 0.6) return [for (var i = rng.nextInt(4); i > 0; i--) _value(rng, depth + 1)];
+  final map = <String, Object?>{};
+  for (var i = rng.nextInt(4); i > 0; i--) {
+    map[_keys[rng.nextInt(_keys.length)]] = _value(rng, depth + 1);
+  }
+  return map;
+}
+
+Object? _item(Random rng) {
+  final c = rng.nextDouble();
+  if (c < 0.4) {
+    final first = <String, Object?>{'timestamp': 1};
+    if (rng.nextDouble() < 0.7) first['href'] = _hrefs[rng.nextInt(_hrefs.length)];
+    if (rng.nextDouble() < 0.7) first['value'] = 'Vé${rng.nextInt(10)}';
+    final entries = <Object?>[first, <String, Object?>{'href': 'https://x/second/'}];
+    return <String, Object?>{'title': '', 'string_list_data': entries.sublist(0, rng.nextInt(3))};
+  }
+  if (c < 0.6) {
+    final sld = <Object?>[<Object?>[], 's', <Object?>[1], <Object?>[<String, Object?>{'value': 'vv'}]];
+    return <String, Object?>{'username': 'Us"er${rng.nextInt(10)}', 'string_list_data': sld[rng.nextInt(sld.length)]};
+  }
+  return _value(rng);
+}
+
+Object? _document(Random rng) {
+  final Object? doc;
+  if (rng.nextBool()) {
+    doc = [for (var i = rng.nextInt(7); i > 0; i--) _item(rng)];
+  } else {
+    doc = <String, Object?>{
+      (rng.nextBool() ? 'followers' : 'x'): [for (var i = rng.nextInt(5); i > 0; i--) _item(rng)],
+      'z': _value(rng),
+    };
+  }
+  return rng.nextDouble() < 0.1 ? _value(rng) : doc;
+}
+
+List<List<int>> _chunks(List<int> bytes, int size) =>
+    [for (var i = 0; i < bytes.length; i += size) bytes.sublist(i, min(i + size, bytes.length))];
+
+void main() {
+  test('scanner = json.decode + Uri em 3000 documentos aleatórios, em blocos aleatórios', () {
+    final rng = Random(1);
+    for (var n = 0; n < 3000; n++) {
+      final doc = _document(rng);
+      final text = rng.nextBool() ? jsonEncode(doc) : const JsonEncoder.withIndent(' ').convert(doc);
+      final chunks = _chunks(utf8.encode(text), 1 + rng.nextInt(50));
+      expect(
+        InstagramExportParser.parseFollowersJsonChunks(chunks),
+        InstagramExportParser.parseFollowersJsonDom(text),
+        reason: text,
+      );
+    }
+  });
+
+  test('só o primeiro item de string_list_data conta', () {
+    final text = jsonEncode([
+      <String, Object?>{
+        'string_list_data': [
+          <String, Object?>{'value': 'First'},
+          <String, Object?>{'href': 'https://www.instagram.com/second/'},
+        ],
+      },
+    ]);
+    expect(InstagramExportParser.parseFollowersJsonBytes(utf8.encode(text)), ['first']);
+  });
+
+  test('href com escapes é decodificado como no Uri', () {
+    final text = jsonEncode([
+      <String, Object?>{
+        'string_list_data': [
+          <String, Object?>{'href': 'https://www.instagram.com/_u%2E4/'},
+        ],
+      },
+    ]);
+    expect(InstagramExportParser.parseFollowersJsonBytes(utf8.encode(text)), ['_u.4']);
+  });
+}
+"""
+
+# lib/services/supabase_client.dart
 services_supa = r"""
-// Placeholder para serviços adicionais do Supabase se necessário futuramente.
+import 'dart:async';
+import 'dart:io';
+import 'dart:math';
+import 'package:supabase_flutter/supabase_flutter.dart';
+
+typedef BatchProgress = void Function(int done, int total);
+
+/// Escritas em lote: divide as linhas em blocos de [chunkSize], envia até
+/// [concurrency] blocos em paralelo e repete falhas transitórias com backoff.
+///
+/// Só há upsert com ignoreDuplicates: um bloco gravado no servidor cujo retorno
+/// se perdeu (timeout) é reenviado sem duplicar linhas. Um insert simples não
+/// pode ser repetido assim e não deve passar por aqui.
+class BatchWriter {
+  BatchWriter(
+    this.client, {
+    this.chunkSize = 1000,
+    this.concurrency = 4,
+    this.maxRetries = 4,
+    this.baseDelay = const Duration(milliseconds: 300),
+  });
+
+  final SupabaseClient client;
+  final int chunkSize;
+  final int concurrency;
+  final int maxRetries;
+  final Duration baseDelay;
+
+  static final _random = Random();
+
+  // Statement timeout, serialization/deadlock e erros HTTP temporários
+  static const _transientCodes = {'57014', '40001', '40P01', '408', '425', '429', '500', '502', '503', '504'};
+
+  /// Linhas que já existem em [onConflict] são ignoradas, então o reenvio de
+  /// um bloco que já foi gravado é inofensivo.
+  Future<void> upsert(
+    String table,
+    List<Map<String, dynamic>> rows, {
+    required String onConflict,
+    BatchProgress? onProgress,
+  }) {
+    return _run(
+      rows,
+      (chunk) => client.from(table).upsert(chunk, onConflict: onConflict, ignoreDuplicates: true),
+      onProgress,
+    );
+  }
+
+  Future<void> _run(
+    List<Map<String, dynamic>> rows,
+    Future<dynamic> Function(List<Map<String, dynamic>> chunk) write,
+    BatchProgress? onProgress,
+  ) async {
+    final chunks = <List<Map<String, dynamic>>>[
+      for (var i = 0; i < rows.length; i += chunkSize) rows.sublist(i, min(i + chunkSize, rows.length)),
+    ];
+    var next = 0;
+    var done = 0;
+    var failed = false;
+
+    Future<void> worker() async {
+      while (!failed && next < chunks.length) {
+        final chunk = chunks[next++];
+        try {
+          await _withRetry(() => write(chunk));
+        } catch (_) {
+          // Os outros workers param antes do próximo bloco
+          failed = true;
+          rethrow;
+        }
+        if (failed) return;
+        done += chunk.length;
+        onProgress?.call(done, rows.length);
+      }
+    }
+
+    await Future.wait([for (var i = 0; i < min(concurrency, chunks.length); i++) worker()]);
+  }
+
+  Future<void> _withRetry(Future<dynamic> Function() op) async {
+    for (var attempt = 0;; attempt++) {
+      try {
+        await op();
+        return;
+      } catch (e) {
+        if (attempt >= maxRetries || !_isTransient(e)) rethrow;
+        final jitter = Duration(milliseconds: _random.nextInt(baseDelay.inMilliseconds + 1));
+        await Future.delayed(baseDelay * (1 << attempt) + jitter);
+      }
+    }
+  }
+
+  static bool _isTransient(Object e) {
+    if (e is TimeoutException || e is IOException) return true;
+    if (e is PostgrestException) return _transientCodes.contains(e.code);
+    return false;
+  }
+}
+"""
+
+# lib/services/import_trace.dart
+import_trace = r"""
+import 'dart:convert';
+import 'dart:developer' as developer;
+import 'dart:io';
+import 'package:supabase_flutter/supabase_flutter.dart';
+
+/// Uma etapa medida do upload: início/fim relativos ao começo do trace,
+/// bytes lidos e linhas processadas.
+class TraceSpan {
+  TraceSpan._(this.stage, this.startMicros);
+
+  final String stage;
+  final int startMicros;
+  int? endMicros;
+  int? bytes;
+  int? rows;
+  String? error;
+
+  int get durationMicros => (endMicros ?? startMicros) - startMicros;
+
+  Map<String, dynamic> toJson() => {
+        'stage': stage,
+        'start_ms': startMicros ~/ 1000,
+        'duration_ms': durationMicros ~/ 1000,
+        if (bytes != null) 'bytes': bytes,
+        if (rows != null) 'rows': rows,
+        if (error != null) 'error': error,
+      };
+}
+
+/// Tempo por etapa de uma importação. Cada [span] mede um trecho do pipeline;
+/// [log] emite tudo numa linha JSON e [store] grava em import_metrics.
+class ImportTrace {
+  ImportTrace();
+
+  final DateTime startedAt = DateTime.now().toUtc();
+  final Stopwatch _clock = Stopwatch()..start();
+  final List<TraceSpan> spans = [];
+  int? importId;
+
+  Future<T> span<T>(String stage, Future<T> Function(TraceSpan span) body) async {
+    final span = TraceSpan._(stage, _clock.elapsedMicroseconds);
+    spans.add(span);
+    try {
+      return await body(span);
+    } catch (e) {
+      span.error = e.toString();
+      rethrow;
+    } finally {
+      span.endMicros = _clock.elapsedMicroseconds;
+    }
+  }
+
+  Map<String, dynamic> toJson() => {
+        'event': 'import_trace',
+        'started_at': startedAt.toIso8601String(),
+        if (importId != null) 'import_id': importId,
+        'total_ms': _clock.elapsedMilliseconds,
+        'spans': [for (final s in spans) s.toJson()],
+      };
+
+  void log() => developer.log(jsonEncode(toJson()), name: '{{package}}.import');
+
+  /// Uma linha por etapa, numa única requisição. Falhas aqui não devem
+  /// derrubar a importação: quem chama decide se ignora.
+  Future<void> store(SupabaseClient client) async {
+    final uid = client.auth.currentUser?.id;
+    if (uid == null || spans.isEmpty) return;
+    await client.from('import_metrics').insert([
+      for (final s in spans)
+        {
+          'user_id': uid,
+          'import_id': importId,
+          'stage': s.stage,
+          'started_at': startedAt.add(Duration(microseconds: s.startMicros)).toIso8601String(),
+          'duration_ms': s.durationMicros ~/ 1000,
+          'bytes': s.bytes,
+          'rows': s.rows,
+          'error': s.error,
+          'platform': Platform.operatingSystem,
+        },
+    ]);
+  }
+}
+"""
+
+# lib/services/snapshot_cache.dart
+snapshot_cache = r"""
+import 'dart:convert';
+import 'dart:io';
+import 'dart:isolate';
+import 'dart:typed_data';
+import 'package:path/path.dart' as p;
+import 'package:path_provider/path_provider.dart';
+import 'package:supabase_flutter/supabase_flutter.dart';
+
+/// Lista de seguidores de uma importação já finalizada.
+class CachedSnapshot {
+  const CachedSnapshot(this.importId, this.usernames);
+
+  final int importId;
+  final List<String> usernames;
+}
+
+/// Quem entrou e quem saiu entre o snapshot em cache e a lista nova.
+class SnapshotDelta {
+  const SnapshotDelta(this.entered, this.left);
+
+  final List<String> entered;
+  final List<String> left;
+
+  static SnapshotDelta compute(List<String> prev, List<String> now) {
+    final prevSet = prev.toSet();
+    final nowSet = now.toSet();
+    return SnapshotDelta(
+      [for (final u in now) if (!prevSet.contains(u)) u],
+      [for (final u in prev) if (!nowSet.contains(u)) u],
+    );
+  }
+}
+
+/// Último snapshot de seguidores guardado no aparelho, um arquivo por conta,
+/// identificado pelo imports.id de onde veio.
+///
+/// Formato: "IGCACHE", versão (1 byte), import_id (int64 LE), quantidade
+/// (uint32 LE) e os usernames ordenados, separados por '\n', em gzip.
+class SnapshotCache {
+  SnapshotCache(this.uid, this.file);
+
+  final String uid;
+  final File file;
+
+  static const _magic = [0x49, 0x47, 0x43, 0x41, 0x43, 0x48, 0x45];
+  static const _version = 1;
+  static const _headerSize = 20;
+
+  static Future<SnapshotCache> forUser(String uid) async {
+    final dir = await getApplicationSupportDirectory();
+    return SnapshotCache(uid, File(p.join(dir.path, 'snapshots', '$uid.igcache')));
+  }
+
+  Future<CachedSnapshot?> read() async {
+    if (!await file.exists()) return null;
+    final bytes = await file.readAsBytes();
+    try {
+      return await Isolate.run(() => decode(bytes));
+    } catch (_) {
+      // Cache corrompido ou de outra versão: volta ao envio completo
+      await clear();
+      return null;
+    }
+  }
+
+  /// O cache só vale se for da última importação finalizada da conta
+  /// (uma consulta pelo índice imports_user_finalized_idx, sem baixar a lista).
+  /// Só o cabeçalho é lido antes da consulta: a lista é descomprimida apenas
+  /// quando o cache está em dia.
+  Future<CachedSnapshot?> readIfCurrent(SupabaseClient client) async {
+    final importId = await _readImportId();
+    if (importId == null) return null;
+    final latest = await client.rpc('latest_finalized_import');
+    if (latest != importId) return null;
+    final snapshot = await read();
+    return snapshot?.importId == latest ? snapshot : null;
+  }
+
+  /// imports.id gravado no cabeçalho, sem ler o resto do arquivo.
+  Future<int?> _readImportId() async {
+    if (!await file.exists()) return null;
+    final raf = await file.open();
+    final Uint8List bytes;
+    try {
+      bytes = await raf.read(_headerSize);
+    } finally {
+      await raf.close();
+    }
+    try {
+      return importIdOf(bytes);
+    } on FormatException {
+      await clear();
+      return null;
+    }
+  }
+
+  Future<void> write(int importId, List<String> usernames) async {
+    final bytes = await Isolate.run(() => encode(importId, usernames));
+    await file.parent.create(recursive: true);
+    final tmp = File('${file.path}.tmp');
+    await tmp.writeAsBytes(bytes, flush: true);
+    await tmp.rename(file.path);
+  }
+
+  Future<void> clear() async {
+    if (await file.exists()) await file.delete();
+  }
+
+  static Uint8List encode(int importId, List<String> usernames) {
+    final sorted = [...usernames]..sort();
+    final header = ByteData(_headerSize);
+    for (var i = 0; i < _magic.length; i++) {
+      header.setUint8(i, _magic[i]);
+    }
+    header.setUint8(_magic.length, _version);
+    header.setInt64(8, importId, Endian.little);
+    header.setUint32(16, sorted.length, Endian.little);
+    final out = BytesBuilder(copy: false)
+      ..add(header.buffer.asUint8List())
+      ..add(gzip.encode(utf8.encode(sorted.join('\n'))));
+    return out.takeBytes();
+  }
+
+  /// Confere magic e versão e devolve o import_id do cabeçalho (offset 8).
+  static int importIdOf(Uint8List bytes) {
+    if (bytes.length < _headerSize) throw const FormatException("Cache de snapshot truncado.");
+    for (var i = 0; i < _magic.length; i++) {
+      if (bytes[i] != _magic[i]) throw const FormatException("Não é um cache de snapshot.");
+    }
+    if (bytes[_magic.length] != _version) throw const FormatException("Versão de cache não suportada.");
+    return ByteData.sublistView(bytes, 0, _headerSize).getInt64(8, Endian.little);
+  }
+
+  static CachedSnapshot decode(Uint8List bytes) {
+    final importId = importIdOf(bytes);
+    final count = ByteData.sublistView(bytes, 0, _headerSize).getUint32(16, Endian.little);
+    final text = utf8.decode(gzip.decode(Uint8List.sublistView(bytes, _headerSize)));
+    final usernames = count == 0 ? <String>[] : text.split('\n');
+    if (usernames.length != count) throw const FormatException("Cache de snapshot corrompido.");
+    return CachedSnapshot(importId, usernames);
+  }
+}
 """
 
 # supabase/schema.sql
@@ -747,7 +1967,8 @@ create table if not exists public.imports (
   id bigserial primary key,
   user_id uuid not null,
   source text not null default 'instagram_export',
-  imported_at timestamptz not null default now()
+  imported_at timestamptz not null default now(),
+  finalized_at timestamptz
 );
 
 create table if not exists public.followers (
@@ -760,29 +1981,582 @@ create table if not exists public.followers (
   unique (user_id, username)
 );
 
+-- Projects created before events was partitioned: the plain table is renamed here
+-- and its rows copied into the partitioned one below (see "events migration")
+do $$
+begin
+  if exists (select 1 from pg_class where oid = to_regclass('public.events') and relkind = 'r') then
+    alter table public.events rename to events_unpartitioned;
+    alter index if exists public.events_pkey rename to events_unpartitioned_pkey;
+    alter index if exists public.events_user_type_happened_idx rename to events_unpartitioned_user_type_happened_idx;
+    alter index if exists public.events_import_idx rename to events_unpartitioned_import_idx;
+    alter index if exists public.events_user_import_idx rename to events_unpartitioned_user_import_idx;
+    alter sequence if exists public.events_id_seq rename to events_unpartitioned_id_seq;
+  end if;
+end;
+$$;
+
+-- Range-partitioned by month of happened_at (ensure_events_partition), so old
+-- months can be detached and archived; the primary key has to include the key
 create table if not exists public.events (
-  id bigserial primary key,
+  id bigserial,
   user_id uuid not null,
   username text not null,
   type text check (type in ('follow','unfollow')) not null,
   happened_at timestamptz not null default now(),
-  import_id bigint references public.imports(id) on delete set null
+  import_id bigint references public.imports(id) on delete set null,
+  primary key (id, happened_at)
+) partition by range (happened_at);
+
+-- Catches rows of months without a partition yet
+create table if not exists public.events_default partition of public.events default;
+
+-- Indexes (one per access pattern of home_page, diff_page and finalize_import;
+-- supabase/benchmark.sql shows the plans with and without them)
+-- Latest import of a user
+create index if not exists imports_user_imported_idx
+  on public.imports (user_id, imported_at desc);
+
+-- Current followers of a user: finalize_import anti-join and user_stats backfill
+create index if not exists followers_user_current_idx
+  on public.followers (user_id, username)
+  where last_status = 'current';
+
+-- Keyset pagination of the diff screen: (user_id, type) then newest (happened_at, id) first
+create index if not exists events_user_type_happened_idx
+  on public.events (user_id, type, happened_at desc, id desc);
+
+-- Events of an import (imports FK, on delete set null)
+create index if not exists events_import_idx
+  on public.events (import_id);
+
+-- Left-marking happens inside finalize_import(_delta); the old client-side RPC
+-- is dropped from databases that still have it
+drop function if exists public.mark_followers_left(text[], timestamptz);
+
+-- Staged usernames of an import, consumed by finalize_import (the full list,
+-- change = 'current') or finalize_import_delta (only 'enter' and 'leave' rows)
+create table if not exists public.import_staging (
+  import_id bigint not null references public.imports(id) on delete cascade,
+  user_id uuid not null,
+  username text not null,
+  change text not null default 'current' check (change in ('current','enter','leave')),
+  primary key (import_id, username)
 );
 
+alter table public.import_staging add column if not exists change text not null default 'current'
+  check (change in ('current','enter','leave'));
+
+-- Set by finalize_import(_delta); the last import finalized is the version of
+-- the follower snapshot cached on the device
+alter table public.imports add column if not exists finalized_at timestamptz;
+
+-- latest_finalized_import: order of finalization, not of creation, since an
+-- import created earlier can finish later
+create index if not exists imports_user_finalized_idx
+  on public.imports (user_id, finalized_at desc, id desc)
+  where finalized_at is not null;
+
+create or replace function public.latest_finalized_import()
+returns bigint
+language sql
+stable
+security invoker
+as $$
+  select id from public.imports
+   where user_id = auth.uid() and finalized_at is not null
+   order by finalized_at desc, id desc
+   limit 1;
+$$;
+
+-- Month partition of events for p_at (UTC), created on first use. Rows of that
+-- month already in events_default are moved into it. Partitions get RLS without
+-- policies so they are only reachable through events. App users (auth.uid() set)
+-- can only create the current and the next month; psql sessions, as used by
+-- ingest's load.sql and the migration below, any month.
+create or replace function public.ensure_events_partition(p_at timestamptz)
+returns text
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  v_month timestamp := date_trunc('month', p_at at time zone 'utc');
+  v_from timestamptz := v_month at time zone 'utc';
+  v_to timestamptz := (v_month + interval '1 month') at time zone 'utc';
+  v_name text := 'events_' || to_char(v_month, 'YYYY_MM');
+  v_current timestamp := date_trunc('month', now() at time zone 'utc');
+begin
+  if auth.uid() is not null and (v_month < v_current or v_month > v_current + interval '1 month') then
+    raise exception 'events partition for % is out of range', p_at using errcode = '22008';
+  end if;
+  if to_regclass('public.' || v_name) is not null then
+    return v_name;
+  end if;
+
+  begin
+    if exists (select 1 from public.events_default where happened_at >= v_from and happened_at < v_to) then
+      execute format('create table public.%I (like public.events including defaults including constraints)', v_name);
+      execute format(
+        'with moved as (delete from public.events_default where happened_at >= %L and happened_at < %L returning *)
+         insert into public.%I select * from moved', v_from, v_to, v_name);
+      execute format('alter table public.events attach partition public.%I for values from (%L) to (%L)',
+                     v_name, v_from, v_to);
+    else
+      execute format('create table public.%I partition of public.events for values from (%L) to (%L)',
+                     v_name, v_from, v_to);
+    end if;
+  exception when duplicate_table then
+    -- created by a concurrent import
+    return v_name;
+  end;
+  execute format('alter table public.%I enable row level security', v_name);
+  return v_name;
+end;
+$$;
+
+revoke all on function public.ensure_events_partition(timestamptz) from public, anon;
+grant execute on function public.ensure_events_partition(timestamptz) to authenticated;
+
+select public.ensure_events_partition(now());
+select public.ensure_events_partition(now() + interval '1 month');
+
+-- Per-user, per-day rollup of events, written at import time; charts and
+-- summaries read it instead of scanning events, and it outlives archived partitions
+create table if not exists public.event_daily (
+  user_id uuid not null,
+  day date not null,
+  follows integer not null default 0,
+  unfollows integer not null default 0,
+  follower_count integer,
+  primary key (user_id, day)
+);
+
+-- follower_count is the count after the day's last import
+create or replace function public.record_event_daily(
+  p_user_id uuid, p_at timestamptz, p_follows integer, p_unfollows integer, p_follower_count integer
+)
+returns void
+language sql
+security invoker
+as $$
+  insert into public.event_daily as d (user_id, day, follows, unfollows, follower_count)
+  values (p_user_id, (p_at at time zone 'utc')::date, p_follows, p_unfollows, p_follower_count)
+  on conflict (user_id, day) do update
+    set follows = d.follows + excluded.follows,
+        unfollows = d.unfollows + excluded.unfollows,
+        follower_count = excluded.follower_count;
+$$;
+
+-- Server-side diff: anti-joins the staged list against the current followers,
+-- writes events, updates followers and clears the staging rows
+create or replace function public.finalize_import(p_import_id bigint)
+returns table (entered_count integer, left_count integer, follower_count integer)
+language plpgsql
+security invoker
+as $$
+declare
+  v_uid uuid := auth.uid();
+  v_now timestamptz := now();
+begin
+  if not exists (select 1 from public.imports where id = p_import_id and user_id = v_uid) then
+    raise exception 'import % not found', p_import_id;
+  end if;
+  perform public.ensure_events_partition(v_now);
+
+  insert into public.events (user_id, username, type, happened_at, import_id)
+  select v_uid, s.username, 'follow', v_now, p_import_id
+    from public.import_staging s
+   where s.import_id = p_import_id
+     and not exists (
+       select 1 from public.followers f
+        where f.user_id = v_uid and f.username = s.username and f.last_status = 'current'
+     );
+  get diagnostics entered_count = row_count;
+
+  with gone as (
+    update public.followers f
+       set last_seen = v_now,
+           last_status = 'left'
+     where f.user_id = v_uid
+       and f.last_status = 'current'
+       and not exists (
+         select 1 from public.import_staging s
+          where s.import_id = p_import_id and s.username = f.username
+       )
+    returning f.username
+  )
+  insert into public.events (user_id, username, type, happened_at, import_id)
+  select v_uid, g.username, 'unfollow', v_now, p_import_id from gone g;
+  get diagnostics left_count = row_count;
+
+  insert into public.followers (user_id, username, first_seen, last_seen, last_status)
+  select v_uid, s.username, v_now, v_now, 'current'
+    from public.import_staging s
+   where s.import_id = p_import_id
+  on conflict (user_id, username) do update
+    set last_seen = excluded.last_seen,
+        last_status = 'current';
+  get diagnostics follower_count = row_count;
+
+  update public.imports set finalized_at = v_now where id = p_import_id;
+  delete from public.import_staging where import_id = p_import_id;
+  perform public.checkpoint_followers(p_import_id);
+  perform public.record_event_daily(v_uid, v_now, entered_count, left_count, follower_count);
+
+  return next;
+end;
+$$;
+
+-- Same result as finalize_import, from a client-side diff: only the entered and
+-- left usernames are staged, computed against the snapshot of p_base_import_id.
+-- Raises IG001 when p_base_import_id is no longer the latest finalized import.
+create or replace function public.finalize_import_delta(p_import_id bigint, p_base_import_id bigint)
+returns table (entered_count integer, left_count integer, follower_count integer)
+language plpgsql
+security invoker
+as $$
+declare
+  v_uid uuid := auth.uid();
+  v_now timestamptz := now();
+begin
+  if not exists (select 1 from public.imports where id = p_import_id and user_id = v_uid) then
+    raise exception 'import % not found', p_import_id;
+  end if;
+  if public.latest_finalized_import() is distinct from p_base_import_id then
+    raise exception 'import % is not the latest snapshot', p_base_import_id using errcode = 'IG001';
+  end if;
+  perform public.ensure_events_partition(v_now);
+
+  insert into public.events (user_id, username, type, happened_at, import_id)
+  select v_uid, s.username, 'follow', v_now, p_import_id
+    from public.import_staging s
+   where s.import_id = p_import_id and s.change = 'enter';
+  get diagnostics entered_count = row_count;
+
+  with gone as (
+    update public.followers f
+       set last_seen = v_now,
+           last_status = 'left'
+      from public.import_staging s
+     where s.import_id = p_import_id
+       and s.change = 'leave'
+       and f.user_id = v_uid
+       and f.username = s.username
+       and f.last_status = 'current'
+    returning f.username
+  )
+  insert into public.events (user_id, username, type, happened_at, import_id)
+  select v_uid, g.username, 'unfollow', v_now, p_import_id from gone g;
+  get diagnostics left_count = row_count;
+
+  insert into public.followers (user_id, username, first_seen, last_seen, last_status)
+  select v_uid, s.username, v_now, v_now, 'current'
+    from public.import_staging s
+   where s.import_id = p_import_id and s.change = 'enter'
+  on conflict (user_id, username) do update
+    set last_seen = excluded.last_seen,
+        last_status = 'current';
+
+  -- Retained followers are not rewritten (that would touch every row): their last
+  -- sighting is imports.finalized_at of this import. The count is user_stats',
+  -- already updated by the statement triggers above.
+  select coalesce(max(s.follower_count), 0) into follower_count
+    from public.user_stats s where s.user_id = v_uid;
+
+  update public.imports set finalized_at = v_now where id = p_import_id;
+  delete from public.import_staging where import_id = p_import_id;
+  perform public.checkpoint_followers(p_import_id);
+  perform public.record_event_daily(v_uid, v_now, entered_count, left_count, follower_count);
+
+  return next;
+end;
+$$;
+
+-- History: the events of each import are its delta; every {{checkpoint_interval}} finalized
+-- imports the full follower list is kept as a checkpoint, so any past snapshot is
+-- one checkpoint plus at most {{checkpoint_interval}} imports of events
+create table if not exists public.follower_checkpoints (
+  user_id uuid not null,
+  import_id bigint not null references public.imports(id) on delete cascade,
+  usernames text[] not null,
+  created_at timestamptz not null default now(),
+  primary key (user_id, import_id)
+);
+
+-- Replay of a user's events by import range
+create index if not exists events_user_import_idx
+  on public.events (user_id, import_id);
+
+-- Explicit user for psql sessions without a JWT (ingest's load.sql); RLS still
+-- limits app users to their own rows
+create or replace function public.checkpoint_user_followers(p_user_id uuid, p_import_id bigint)
+returns boolean
+language plpgsql
+security invoker
+as $$
+declare
+  v_uid uuid := p_user_id;
+  v_last bigint;
+begin
+  select max(import_id) into v_last from public.follower_checkpoints where user_id = v_uid;
+  if v_last is not null and (
+    select count(*) from public.imports
+     where user_id = v_uid and finalized_at is not null and id > v_last and id <= p_import_id
+  ) < {{checkpoint_interval}} then
+    return false;
+  end if;
+
+  insert into public.follower_checkpoints (user_id, import_id, usernames)
+  select v_uid, p_import_id, coalesce(array_agg(username order by username), '{}')
+    from public.followers
+   where user_id = v_uid and last_status = 'current'
+  on conflict (user_id, import_id) do nothing;
+  return true;
+end;
+$$;
+
+create or replace function public.checkpoint_followers(p_import_id bigint)
+returns boolean
+language sql
+security invoker
+as $$
+  select public.checkpoint_user_followers(auth.uid(), p_import_id);
+$$;
+
+-- Followers as of an import: nearest checkpoint at or before it, then the last
+-- event per username of the imports in between (without a checkpoint, a full replay)
+create or replace function public.followers_as_of(p_import_id bigint)
+returns setof text
+language sql
+stable
+security invoker
+as $$
+  with cp as (
+    select c.import_id, c.usernames
+      from public.follower_checkpoints c
+     where c.user_id = auth.uid() and c.import_id <= p_import_id
+     order by c.import_id desc
+     limit 1
+  ),
+  last_event as (
+    select distinct on (e.username) e.username, e.type
+      from public.events e
+     where e.user_id = auth.uid()
+       and e.import_id > coalesce((select import_id from cp), 0)
+       and e.import_id <= p_import_id
+     order by e.username, e.id desc
+  )
+  select u from cp, unnest(cp.usernames) u
+   where not exists (select 1 from last_event l where l.username = u)
+  union all
+  select username from last_event where type = 'follow';
+$$;
+
+-- Per-user counters for the home screen, maintained by statement-level triggers
+create table if not exists public.user_stats (
+  user_id uuid primary key,
+  follower_count integer not null default 0,
+  follow_count integer not null default 0,
+  unfollow_count integer not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+-- Home screen in one round trip: the user_stats counters plus the event_daily
+-- sums of the last p_days days (UTC)
+create or replace function public.home_stats(p_days integer default 30)
+returns table (
+  follower_count integer, follow_count integer, unfollow_count integer,
+  recent_follows integer, recent_unfollows integer
+)
+language sql
+stable
+security invoker
+as $$
+  select coalesce(s.follower_count, 0), coalesce(s.follow_count, 0), coalesce(s.unfollow_count, 0),
+         coalesce(d.follows, 0)::integer, coalesce(d.unfollows, 0)::integer
+    from (select auth.uid() as user_id) u
+    left join public.user_stats s on s.user_id = u.user_id
+    cross join lateral (
+      select sum(e.follows) as follows, sum(e.unfollows) as unfollows
+        from public.event_daily e
+       where e.user_id = u.user_id
+         and e.day >= ((now() at time zone 'utc') - make_interval(days => p_days))::date
+    ) d;
+$$;
+
+-- Transition tables only exist for the triggering operation, so each branch
+-- references just the ones its trigger declares
+create or replace function public.user_stats_on_followers()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op = 'INSERT' then
+    insert into public.user_stats as s (user_id, follower_count)
+    select user_id, count(*) from new_rows where last_status = 'current' group by user_id
+    on conflict (user_id) do update
+      set follower_count = s.follower_count + excluded.follower_count, updated_at = now();
+  elsif tg_op = 'UPDATE' then
+    insert into public.user_stats as s (user_id, follower_count)
+    select n.user_id, sum((n.last_status = 'current')::int - (o.last_status = 'current')::int)
+      from new_rows n join old_rows o using (id)
+     group by n.user_id
+    on conflict (user_id) do update
+      set follower_count = s.follower_count + excluded.follower_count, updated_at = now();
+  else
+    insert into public.user_stats as s (user_id, follower_count)
+    select user_id, -count(*) from old_rows where last_status = 'current' group by user_id
+    on conflict (user_id) do update
+      set follower_count = s.follower_count + excluded.follower_count, updated_at = now();
+  end if;
+  return null;
+end;
+$$;
+
+create or replace function public.user_stats_on_events()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op = 'INSERT' then
+    insert into public.user_stats as s (user_id, follow_count, unfollow_count)
+    select user_id, count(*) filter (where type = 'follow'), count(*) filter (where type = 'unfollow')
+      from new_rows group by user_id
+    on conflict (user_id) do update
+      set follow_count = s.follow_count + excluded.follow_count,
+          unfollow_count = s.unfollow_count + excluded.unfollow_count,
+          updated_at = now();
+  else
+    insert into public.user_stats as s (user_id, follow_count, unfollow_count)
+    select user_id, -count(*) filter (where type = 'follow'), -count(*) filter (where type = 'unfollow')
+      from old_rows group by user_id
+    on conflict (user_id) do update
+      set follow_count = s.follow_count + excluded.follow_count,
+          unfollow_count = s.unfollow_count + excluded.unfollow_count,
+          updated_at = now();
+  end if;
+  return null;
+end;
+$$;
+
+create or replace trigger followers_stats_ins after insert on public.followers
+  referencing new table as new_rows for each statement execute function public.user_stats_on_followers();
+create or replace trigger followers_stats_upd after update on public.followers
+  referencing old table as old_rows new table as new_rows for each statement execute function public.user_stats_on_followers();
+create or replace trigger followers_stats_del after delete on public.followers
+  referencing old table as old_rows for each statement execute function public.user_stats_on_followers();
+create or replace trigger events_stats_ins after insert on public.events
+  referencing new table as new_rows for each statement execute function public.user_stats_on_events();
+create or replace trigger events_stats_del after delete on public.events
+  referencing old table as old_rows for each statement execute function public.user_stats_on_events();
+
+-- events migration: rows of the renamed plain table are copied once, month
+-- partitions first; user_stats already counts them, so its trigger is off meanwhile.
+-- Drop events_unpartitioned after checking the copy.
+do $$
+declare
+  v_month timestamptz;
+begin
+  if to_regclass('public.events_unpartitioned') is not null and not exists (select 1 from public.events) then
+    for v_month in select distinct date_trunc('month', happened_at) from public.events_unpartitioned loop
+      perform public.ensure_events_partition(v_month);
+    end loop;
+    alter table public.events disable trigger events_stats_ins;
+    insert into public.events (id, user_id, username, type, happened_at, import_id)
+    select id, user_id, username, type, happened_at, import_id from public.events_unpartitioned;
+    alter table public.events enable trigger events_stats_ins;
+    perform setval(pg_get_serial_sequence('public.events', 'id'), (select max(id) from public.events));
+  end if;
+end;
+$$;
+
+-- Backfill for accounts that already have data
+insert into public.user_stats (user_id, follower_count, follow_count, unfollow_count)
+select u.user_id,
+       (select count(*) from public.followers f where f.user_id = u.user_id and f.last_status = 'current'),
+       (select count(*) from public.events e where e.user_id = u.user_id and e.type = 'follow'),
+       (select count(*) from public.events e where e.user_id = u.user_id and e.type = 'unfollow')
+  from (select user_id from public.followers union select user_id from public.events) u
+on conflict (user_id) do nothing;
+
+insert into public.event_daily (user_id, day, follows, unfollows)
+select user_id, (happened_at at time zone 'utc')::date,
+       count(*) filter (where type = 'follow'), count(*) filter (where type = 'unfollow')
+  from public.events
+ group by 1, 2
+on conflict (user_id, day) do nothing;
+
+-- Per-stage upload timings sent by the app (optional, IMPORT_METRICS=true in .env)
+create table if not exists public.import_metrics (
+  id bigserial primary key,
+  user_id uuid not null references auth.users(id) on delete cascade,
+  import_id bigint references public.imports(id) on delete cascade,
+  stage text not null,
+  started_at timestamptz not null,
+  duration_ms integer not null,
+  bytes bigint,
+  rows bigint,
+  error text,
+  platform text
+);
+
+create index if not exists import_metrics_stage_started_idx
+  on public.import_metrics (stage, started_at desc);
+
 -- RLS
 alter table public.imports enable row level security;
 alter table public.followers enable row level security;
 alter table public.events enable row level security;
-
--- Policies (owner-based: user_id = auth.uid())
+alter table public.import_staging enable row level security;
+alter table public.user_stats enable row level security;
+alter table public.import_metrics enable row level security;
+alter table public.follower_checkpoints enable row level security;
+alter table public.event_daily enable row level security;
+alter table public.events_default enable row level security;
+
+-- Policies (owner-based: user_id = auth.uid()), dropped first so the script can be re-run
+drop policy if exists "imports own rows" on public.imports;
 create policy "imports own rows" on public.imports
   for all using (user_id = auth.uid()) with check (user_id = auth.uid());
 
+drop policy if exists "followers own rows" on public.followers;
 create policy "followers own rows" on public.followers
   for all using (user_id = auth.uid()) with check (user_id = auth.uid());
 
+drop policy if exists "events own rows" on public.events;
 create policy "events own rows" on public.events
   for all using (user_id = auth.uid()) with check (user_id = auth.uid());
+
+drop policy if exists "import_staging own rows" on public.import_staging;
+create policy "import_staging own rows" on public.import_staging
+  for all using (user_id = auth.uid()) with check (user_id = auth.uid());
+
+-- Read-only for clients: only the triggers write counters
+drop policy if exists "user_stats own row" on public.user_stats;
+create policy "user_stats own row" on public.user_stats
+  for select using (user_id = auth.uid());
+
+-- Write-once from the client; aggregate across users with the service role
+drop policy if exists "import_metrics insert own" on public.import_metrics;
+create policy "import_metrics insert own" on public.import_metrics
+  for insert with check (user_id = auth.uid());
+
+drop policy if exists "import_metrics select own" on public.import_metrics;
+create policy "import_metrics select own" on public.import_metrics
+  for select using (user_id = auth.uid());
+
+drop policy if exists "follower_checkpoints own rows" on public.follower_checkpoints;
+create policy "follower_checkpoints own rows" on public.follower_checkpoints
+  for all using (user_id = auth.uid()) with check (user_id = auth.uid());
+
+drop policy if exists "event_daily own rows" on public.event_daily;
+create policy "event_daily own rows" on public.event_daily
+  for all using (user_id = auth.uid()) with check (user_id = auth.uid());
 """
 
 # supabase/README.sql.md
@@ -792,6 +2566,169 @@ supabase_readme = """
 1. No dashboard do Supabase, vá em **SQL** > **New query** e cole o conteúdo de `schema.sql`.
 2. Execute.
 3. Em **Authentication** > **Providers**, deixe **Email** habilitado (Magic Link).
+
+## Histórico
+
+Cada importação guarda só o delta (os `events` dela) e, a cada {{checkpoint_interval}} importações, a lista
+completa em `follower_checkpoints`. Seguidores como estavam em uma importação:
+
+```sql
+select * from public.followers_as_of(42);
+```
+
+## Partições e resumos diários
+
+`events` é particionada por mês de `happened_at` (`events_2026_01`, `events_2026_02`, ...); cada
+importação cria a partição do mês se ainda não existir. Contagens por dia ficam em `event_daily`,
+atualizada na importação, e são o que a tela inicial e gráficos devem ler.
+
+Para arquivar um mês antigo (os totais em `user_stats` e `event_daily` não mudam):
+
+```sql
+alter table public.events detach partition public.events_2025_01 concurrently;
+-- pg_dump -t public.events_2025_01 ... e depois:
+drop table public.events_2025_01;
+```
+
+`followers_as_of` só reconstrói importações cujos `events` continuam anexados; mantenha ao menos
+os meses desde o último checkpoint de cada usuário.
+
+Projetos criados antes do particionamento: rodar o `schema.sql` de novo renomeia a tabela antiga
+para `events_unpartitioned` e copia as linhas; apague-a depois de conferir.
+
+{{benchmark_docs}}## Métricas de upload
+
+Com `IMPORT_METRICS=true` no `.env`, o app grava a duração de cada etapa do upload
+(`parse`, `create_import`, `stage_upload`, `finalize`) em `import_metrics`. Latência por etapa,
+entre todos os usuários (com a service role):
+
+```sql
+select stage, count(*),
+       percentile_cont(0.5) within group (order by duration_ms) as p50_ms,
+       percentile_cont(0.95) within group (order by duration_ms) as p95_ms
+  from public.import_metrics
+ where started_at > now() - interval '7 days' and error is null
+ group by stage order by stage;
+```
+"""
+
+# Section of supabase/README.sql.md, only with the "benchmarks" feature
+benchmark_docs = """## Benchmark de índices
+
+`benchmark.sql` cria um schema temporário `bench`, popula um volume realista e mostra
+os planos `EXPLAIN ANALYZE` das consultas do app antes e depois dos índices do `schema.sql`:
+
+```bash
+psql "$DATABASE_URL" -v users=200 -v followers=20000 -f supabase/benchmark.sql
+```
+
+"""
+
+# supabase/benchmark.sql
+bench_sql = r"""
+-- Index benchmark: seeds a scratch schema and prints the plans of the app queries
+-- without and with the indexes from schema.sql.
+-- psql -v users=200 -v followers=20000 -v events=2000 -f supabase/benchmark.sql
+\if :{?users}
+\else
+  \set users 200
+\endif
+\if :{?followers}
+\else
+  \set followers 20000
+\endif
+\if :{?events}
+\else
+  \set events 2000
+\endif
+\set ON_ERROR_STOP on
+\timing on
+
+drop schema if exists bench cascade;
+create schema bench;
+
+-- Same columns as public.*, no indexes
+create table bench.imports (like public.imports including defaults);
+create table bench.followers (like public.followers including defaults);
+create table bench.events (like public.events including defaults);
+
+insert into bench.imports (id, user_id, imported_at)
+select (u - 1) * 10 + i, md5(u::text)::uuid, now() - (10 - i) * interval '7 days'
+  from generate_series(1, :users) u, generate_series(1, 10) i;
+
+insert into bench.followers (id, user_id, username, first_seen, last_seen, last_status)
+select (u - 1) * :followers + f, md5(u::text)::uuid, 'user_' || u || '_' || f,
+       now() - interval '70 days', now(),
+       case when f % 10 = 0 then 'left' else 'current' end
+  from generate_series(1, :users) u, generate_series(1, :followers) f;
+
+insert into bench.events (id, user_id, username, type, happened_at, import_id)
+select (u - 1) * :events + e, md5(u::text)::uuid, 'user_' || u || '_' || e,
+       case when e % 3 = 0 then 'unfollow' else 'follow' end,
+       now() - (e % 10) * interval '7 days' - e * interval '1 second',
+       (u - 1) * 10 + 1 + e % 10
+  from generate_series(1, :users) u, generate_series(1, :events) e;
+
+analyze bench.imports;
+analyze bench.followers;
+analyze bench.events;
+
+select md5('1')::uuid as uid \gset
+select happened_at as cursor_at, id as cursor_id
+  from bench.events where user_id = :'uid' and type = 'follow'
+ order by happened_at desc, id desc offset 49 limit 1 \gset
+
+\set explain 'explain (analyze, buffers, costs off)'
+
+\echo '=== BEFORE (no indexes) ==='
+\ir benchmark_queries.sql
+
+create index on bench.imports (user_id, imported_at desc);
+create index on bench.followers (user_id, username) where last_status = 'current';
+create index on bench.events (user_id, type, happened_at desc, id desc);
+create index on bench.events (import_id);
+analyze bench.imports;
+analyze bench.followers;
+analyze bench.events;
+
+\echo '=== AFTER (schema.sql indexes) ==='
+\ir benchmark_queries.sql
+
+drop schema bench cascade;
+"""
+
+# supabase/benchmark_queries.sql
+bench_queries_sql = r"""
+-- Queries of the generated app, run by benchmark.sql before and after indexing
+\echo '-- diff_page: first page'
+:explain
+select id, username, type, happened_at from bench.events
+ where user_id = :'uid' and type = 'follow'
+ order by happened_at desc, id desc limit 50;
+
+\echo '-- diff_page: next page (keyset)'
+:explain
+select id, username, type, happened_at from bench.events
+ where user_id = :'uid' and type = 'follow'
+   and (happened_at < :'cursor_at' or (happened_at = :'cursor_at' and id < :cursor_id))
+ order by happened_at desc, id desc limit 50;
+
+\echo '-- finalize_import: current followers of the user'
+:explain
+select username from bench.followers
+ where user_id = :'uid' and last_status = 'current';
+
+\echo '-- user_stats backfill: counts per user'
+:explain
+select count(*) from bench.events where user_id = :'uid' and type = 'unfollow';
+
+\echo '-- latest import'
+:explain
+select id from bench.imports where user_id = :'uid' order by imported_at desc limit 1;
+
+\echo '-- events of an import (imports FK)'
+:explain
+select count(*) from bench.events where import_id = 1;
 """
 
 # Write files
@@ -805,24 +2742,300 @@ files = {
     "lib/pages/upload_page.dart": upload_page,
     "lib/pages/diff_page.dart": diff_page,
     "lib/utils/parser.dart": parser_dart,
+    "benchmark/parser_benchmark.dart": parser_benchmark,
+    "test/parser_test.dart": parser_test,
     "lib/services/supabase_client.dart": services_supa,
+    "lib/services/import_trace.dart": import_trace,
+    "lib/services/snapshot_cache.dart": snapshot_cache,
     "supabase/schema.sql": schema_sql,
     "supabase/README.sql.md": supabase_readme,
+    "supabase/benchmark.sql": bench_sql,
+    "supabase/benchmark_queries.sql": bench_queries_sql,
 }
 
-for path, content in files.items():
-    full = os.path.join(base, path)
-    os.makedirs(os.path.dirname(full), exist_ok=True)
-    with open(full, "w", encoding="utf-8") as f:
-        f.write(textwrap.dedent(content).lstrip())
 
-# Zip it
-zip_path = "/mnt/data/insta_diff_flutter_supabase.zip"
-with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
-    for root, _, filenames in os.walk(base):
-        for fn in filenames:
-            full = os.path.join(root, fn)
-            rel = os.path.relpath(full, base)
-            z.write(full, arcname=f"insta_diff_flutter_supabase/{rel}")
-
-zip_path
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Template parameters: {{name}} placeholders, filled per app variant
+DEFAULT_VARIANT = {
+    "package": "insta_diff",
+    "app_name": "Insta Diff",
+    "version": "0.1.0+1",
+    "seed_color": "indigo",
+    "supabase_url": "coloque_sua_url_aqui",
+    "supabase_anon_key": "coloque_seu_anon_key_aqui",
+    "checkpoint_interval": 10,
+    "features": ["benchmarks"],
+}
+FEATURES = {"benchmarks", "import_metrics"}
+FEATURE_FILES = {
+    "benchmarks": ("benchmark/parser_benchmark.dart", "supabase/benchmark.sql", "supabase/benchmark_queries.sql"),
+}
+_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+_DART_PACKAGE = re.compile(r"^[a-z_][a-z0-9_]*$")
+_VARIANT_NAME = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]*$")
+_CONTROL_CHARS = re.compile(r"[\x00-\x1f\x7f]")
+_QUOTES = re.compile(r"[\"'`\\]")
+
+
+class Template:
+    """A template compiled once: dedented, then split into literals and placeholder names."""
+
+    __slots__ = ("parts", "names")
+
+    def __init__(self, source):
+        self.parts = _PLACEHOLDER.split(textwrap.dedent(source).lstrip())
+        self.names = tuple(sorted(set(self.parts[1::2])))
+
+    def render(self, params):
+        if len(self.parts) == 1:
+            return self.parts[0]
+        out = list(self.parts)
+        out[1::2] = [params[name] for name in self.parts[1::2]]
+        return "".join(out)
+
+
+templates = {path: Template(content) for path, content in files.items()}
+# (path, values of that template's placeholders) -> text; files without
+# placeholders or with the same values are rendered once per process
+_rendered = {}
+
+
+def _dart_string(text):
+    return text.replace("\\", "\\\\").replace("'", "\\'").replace('"', '\\"').replace("$", "\\$")
+
+
+def variant_name(config):
+    # Used as the ZIP file name and its root folder: no separators or leading dot
+    name = config.get("name") or config.get("package", DEFAULT_VARIANT["package"])
+    if not isinstance(name, str) or not _VARIANT_NAME.match(name):
+        raise ValueError(f"variante inválida: nome {name!r} (use letras, números, '_', '.' e '-')")
+    return name
+
+
+def variant_params(config=None):
+    """Placeholder values and selected file paths for one variant config (DEFAULT_VARIANT overrides)."""
+    config = {**DEFAULT_VARIANT, **(config or {})}
+    unknown = config.keys() - DEFAULT_VARIANT.keys() - {"name"}
+    if unknown:
+        raise ValueError(f"variante inválida: chaves desconhecidas {sorted(unknown)}")
+    # Values go into .env, YAML, SQL and Dart as they are; only app_name is escaped (app_title)
+    for key, value in config.items():
+        if isinstance(value, str) and (_CONTROL_CHARS.search(value) or (key != "app_name" and _QUOTES.search(value))):
+            raise ValueError(f"variante inválida: {key} {value!r} tem aspas ou caracteres de controle")
+    variant_name(config)
+    features = set(config["features"])
+    if features - FEATURES:
+        raise ValueError(f"variante inválida: features desconhecidas {sorted(features - FEATURES)}")
+    if not isinstance(config["checkpoint_interval"], int) or config["checkpoint_interval"] < 1:
+        raise ValueError(f"variante inválida: checkpoint_interval {config['checkpoint_interval']!r}")
+    if not _DART_PACKAGE.match(config["package"]):
+        raise ValueError(f"variante inválida: nome de pacote Dart {config['package']!r}")
+    color = config["seed_color"]
+    if re.match(r"^#[0-9a-fA-F]{6}$", color):
+        color = f"Color(0xFF{color[1:].upper()})"
+    elif re.match(r"^[a-zA-Z]\w*$", color):
+        color = f"Colors.{color}"
+    else:
+        raise ValueError(f"variante inválida: seed_color {color!r} (use #RRGGBB ou um nome de Colors)")
+
+    params = {k: str(v) for k, v in config.items() if k not in ("features", "name")}
+    params.update(
+        app_title=_dart_string(config["app_name"]),
+        seed_color=color,
+        import_metrics="true" if "import_metrics" in features else "false",
+        benchmark_docs=benchmark_docs if "benchmarks" in features else "",
+    )
+    excluded = {path for feature, paths in FEATURE_FILES.items() if feature not in features for path in paths}
+    return params, [path for path in files if path not in excluded]
+
+
+def render(config=None):
+    params, paths = variant_params(config)
+    out = {}
+    for path in paths:
+        template = templates[path]
+        key = (path, tuple(params[name] for name in template.names))
+        text = _rendered.get(key)
+        if text is None:
+            text = _rendered[key] = template.render(params)
+        out[path] = text
+    return out
+
+
+def tree_digest(manifest):
+    return _digest(json.dumps(manifest, sort_keys=True))
+
+
+class _StreamOut:
+    # Write-only view of the output: zipfile then always uses the streaming layout
+    # (data descriptors), so a pipe, a socket and a BytesIO get the same bytes
+    def __init__(self, raw):
+        self.raw = raw
+
+    def write(self, data):
+        return self.raw.write(data)
+
+    def flush(self):
+        self.raw.flush()
+
+
+def write_zip(out, rendered=None, root=ZIP_ROOT):
+    """Stream the project as a ZIP into a binary file object (BytesIO, stdout, socket file).
+
+    Nothing touches the disk. Entries are sorted with fixed timestamps and
+    permissions, so identical templates produce identical bytes; the tree
+    digest is stored as the ZIP comment and returned, to be used as a cache key.
+    """
+    rendered = render() if rendered is None else rendered
+    digest = tree_digest({path: _digest(text) for path, text in rendered.items()})
+    with zipfile.ZipFile(_StreamOut(out), "w", zipfile.ZIP_DEFLATED) as z:
+        for path in sorted(rendered):
+            info = zipfile.ZipInfo(f"{root}/{path}", date_time=ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3
+            info.external_attr = 0o644 << 16
+            z.writestr(info, rendered[path])
+        z.comment = digest.encode()
+    return digest
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _zip_digest(zip_file):
+    try:
+        with zipfile.ZipFile(zip_file) as z:
+            return z.comment.decode()
+    except (OSError, zipfile.BadZipFile, UnicodeDecodeError):
+        return None
+
+
+def generate(out_dir=base, zip_file=zip_path, force=False):
+    rendered = render()
+    manifest = {path: _digest(text) for path, text in rendered.items()}
+    previous = {} if force else _read_manifest(out_dir)
+
+    for d in dirs:
+        os.makedirs(os.path.join(out_dir, d), exist_ok=True)
+
+    # Unchanged files are not rewritten, so their mtimes (and Flutter/Gradle
+    # incremental builds) survive a regeneration
+    for path, text in rendered.items():
+        full = os.path.join(out_dir, path)
+        data = text.encode("utf-8")
+        if previous.get(path) == manifest[path] and os.path.isfile(full) and os.path.getsize(full) == len(data):
+            continue
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "wb") as f:
+            f.write(data)
+    for path in previous.keys() - manifest.keys():
+        full = os.path.join(out_dir, path)
+        if os.path.isfile(full):
+            os.remove(full)
+    if manifest != previous:
+        tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, os.path.join(out_dir, MANIFEST))
+
+    # Zip it, only when the generated tree changed (its digest is the ZIP comment)
+    if force or _zip_digest(zip_file) != tree_digest(manifest):
+        tmp = f"{zip_file}.tmp"
+        with open(tmp, "wb") as f:
+            write_zip(f, rendered)
+        os.replace(tmp, zip_file)
+
+    return zip_file
+
+
+def _write_variant(config, out_dir):
+    name = variant_name(config)
+    rendered = render(config)
+    path = os.path.join(out_dir, f"{name}.zip")
+    buf = io.BytesIO()
+    digest = write_zip(buf, rendered, root=name)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(buf.getbuffer())
+    os.replace(f"{path}.tmp", path)
+    return {"name": name, "zip": path, "digest": digest, "bytes": buf.tell()}
+
+
+def generate_variants(configs, out_dir, jobs=None):
+    """Render every variant config into ``out_dir/<name>.zip`` on a process pool.
+
+    Templates are compiled once at import; each worker keeps its render cache,
+    so files a variant does not change are rendered once per worker.
+    """
+    for config in configs:
+        variant_params(config)  # fail before starting the pool
+    names = [variant_name(c) for c in configs]
+    if len(set(names)) != len(names):
+        raise ValueError("variantes com o mesmo nome")
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+    workers = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(configs) // (4 * workers))
+        results = list(pool.map(_write_variant, configs, [out_dir] * len(configs), chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+    return results, {"variants": len(results), "seconds": round(elapsed, 3),
+                     "variants_per_second": round(len(results) / elapsed, 1) if elapsed else None}
+
+
+def _read_configs(path):
+    # JSON list of variant objects, or one object per line (JSONL)
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gerador do app Insta Diff e carga offline de exports do Instagram.")
+    sub = ap.add_subparsers(dest="command")
+
+    gen = sub.add_parser("generate", help="gera o projeto Flutter + Supabase e o ZIP (padrão)")
+    gen.add_argument("--out", default=base, help="diretório do projeto gerado")
+    gen.add_argument("--zip", default=zip_path, help="arquivo ZIP de saída")
+    gen.add_argument("--force", action="store_true", help="regrava todos os arquivos e o ZIP")
+    gen.add_argument("--stdout", action="store_true", help="só o ZIP (reprodutível) na saída padrão, sem gravar em disco")
+
+    ing = sub.add_parser("ingest", help="converte um export em arquivos COPY para imports/followers/events")
+    ingest.add_arguments(ing)
+
+    batch = sub.add_parser("batch", help="ingest de várias contas (um diretório de exports) em paralelo")
+    ingest.add_batch_arguments(batch)
+
+    var = sub.add_parser("variants", help="gera um ZIP por variante do app (nome, cor, Supabase, features)")
+    var.add_argument("configs", help=f"JSON/JSONL de variantes; chaves: name, {', '.join(DEFAULT_VARIANT)}")
+    var.add_argument("--out", required=True, help="diretório dos ZIPs (<name>.zip)")
+    var.add_argument("-j", "--jobs", type=int, help="processos (padrão: número de CPUs)")
+
+    args = ap.parse_args(argv)
+    if args.command == "ingest":
+        counts = ingest.run(args)
+        print(json.dumps(counts))
+    elif args.command == "batch":
+        summary = ingest.run_batch(args)
+        print(json.dumps(summary))
+    elif args.command == "variants":
+        _, summary = generate_variants(_read_configs(args.configs), args.out, args.jobs)
+        print(json.dumps(summary))
+    elif getattr(args, "stdout", False):
+        write_zip(sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    else:
+        print(generate(getattr(args, "out", base), getattr(args, "zip", zip_path), getattr(args, "force", False)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,873 @@
+# Local PostgREST stand-in for offline load tests of the generated app
+#
+#   python postgrest_local.py --db local.sqlite --port 54321 --latency-ms 20
+#
+# Serves /rest/v1 over SQLite with the tables, triggers and RPCs of
+# supabase/schema.sql, implementing the PostgREST subset the templates use:
+#
+#   GET/HEAD    select=, column filters (eq, neq, gt, gte, lt, lte, like, ilike,
+#               in, is, not.*), or=/and= trees, order=, limit=, offset=,
+#               Prefer: count=exact (Content-Range)
+#   POST        insert of one object or a list; upsert with on_conflict= and
+#               Prefer: resolution=merge-duplicates | ignore-duplicates
+#   PATCH       update matching the filters (.update().match / .eq)
+#   DELETE      delete matching the filters
+#   POST /rpc/  finalize_import, finalize_import_delta, latest_finalized_import,
+#               checkpoint_followers, checkpoint_user_followers, followers_as_of,
+#               home_stats, record_event_daily
+#
+# Accept: application/vnd.pgrst.object+json (.single() / .maybeSingle()) and
+# Prefer: return=representation behave as in PostgREST. Row level security is
+# the schema's: every row belongs to the JWT's ``sub`` (the token is decoded,
+# not verified). Auth endpoints are not emulated; use make_token() for clients.
+#
+# Every request is timed: GET /__stats returns per-route round trips and
+# latency percentiles, POST /__reset clears them, --log appends one JSON line
+# per request.
+
+import argparse, base64, json, re, sqlite3, threading, time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+OBJECT_MEDIA_TYPE = "application/vnd.pgrst.object+json"
+
+_NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')"
+
+SCHEMA = f"""
+create table if not exists imports (
+  id integer primary key autoincrement,
+  user_id text not null,
+  source text not null default 'instagram_export',
+  imported_at text not null default ({_NOW_SQL}),
+  finalized_at text
+);
+
+create table if not exists followers (
+  id integer primary key autoincrement,
+  user_id text not null,
+  username text not null,
+  first_seen text,
+  last_seen text,
+  last_status text check (last_status in ('current','left')) default 'current',
+  unique (user_id, username)
+);
+
+-- One table here; month partitions (ensure_events_partition) are Postgres-only
+create table if not exists events (
+  id integer primary key autoincrement,
+  user_id text not null,
+  username text not null,
+  type text check (type in ('follow','unfollow')) not null,
+  happened_at text not null default ({_NOW_SQL}),
+  import_id integer references imports(id) on delete set null
+);
+
+create table if not exists import_staging (
+  import_id integer not null references imports(id) on delete cascade,
+  user_id text not null,
+  username text not null,
+  change text not null default 'current' check (change in ('current','enter','leave')),
+  primary key (import_id, username)
+);
+
+create table if not exists user_stats (
+  user_id text primary key,
+  follower_count integer not null default 0,
+  follow_count integer not null default 0,
+  unfollow_count integer not null default 0,
+  updated_at text not null default ({_NOW_SQL})
+);
+
+create table if not exists import_metrics (
+  id integer primary key autoincrement,
+  user_id text not null,
+  import_id integer references imports(id) on delete cascade,
+  stage text not null,
+  started_at text not null,
+  duration_ms integer not null,
+  bytes integer,
+  rows integer,
+  error text,
+  platform text
+);
+
+-- usernames: JSON array (text[] in Postgres)
+create table if not exists follower_checkpoints (
+  user_id text not null,
+  import_id integer not null references imports(id) on delete cascade,
+  usernames text not null,
+  created_at text not null default ({_NOW_SQL}),
+  primary key (user_id, import_id)
+);
+
+create table if not exists event_daily (
+  user_id text not null,
+  day text not null,
+  follows integer not null default 0,
+  unfollows integer not null default 0,
+  follower_count integer,
+  primary key (user_id, day)
+);
+
+create index if not exists imports_user_imported_idx on imports (user_id, imported_at desc);
+create index if not exists imports_user_finalized_idx on imports (user_id, finalized_at desc, id desc) where finalized_at is not null;
+create index if not exists followers_user_current_idx on followers (user_id, username) where last_status = 'current';
+create index if not exists events_user_type_happened_idx on events (user_id, type, happened_at desc, id desc);
+create index if not exists events_import_idx on events (import_id);
+create index if not exists events_user_import_idx on events (user_id, import_id);
+
+-- user_stats, kept by row triggers (statement triggers with transition tables in Postgres)
+create trigger if not exists followers_stats_ins after insert on followers when new.last_status = 'current'
+begin
+  insert into user_stats (user_id, follower_count) values (new.user_id, 1)
+  on conflict (user_id) do update set follower_count = follower_count + 1, updated_at = {_NOW_SQL};
+end;
+
+create trigger if not exists followers_stats_upd after update of last_status on followers
+  when old.last_status is not new.last_status
+begin
+  insert into user_stats (user_id, follower_count)
+  values (new.user_id, case when new.last_status = 'current' then 1 else -1 end)
+  on conflict (user_id) do update
+    set follower_count = follower_count + excluded.follower_count, updated_at = {_NOW_SQL};
+end;
+
+create trigger if not exists followers_stats_del after delete on followers when old.last_status = 'current'
+begin
+  insert into user_stats (user_id, follower_count) values (old.user_id, -1)
+  on conflict (user_id) do update set follower_count = follower_count - 1, updated_at = {_NOW_SQL};
+end;
+
+create trigger if not exists events_stats_ins after insert on events
+begin
+  insert into user_stats (user_id, follow_count, unfollow_count)
+  values (new.user_id, new.type = 'follow', new.type = 'unfollow')
+  on conflict (user_id) do update
+    set follow_count = follow_count + excluded.follow_count,
+        unfollow_count = unfollow_count + excluded.unfollow_count,
+        updated_at = {_NOW_SQL};
+end;
+
+create trigger if not exists events_stats_del after delete on events
+begin
+  insert into user_stats (user_id, follow_count, unfollow_count)
+  values (old.user_id, -(old.type = 'follow'), -(old.type = 'unfollow'))
+  on conflict (user_id) do update
+    set follow_count = follow_count + excluded.follow_count,
+        unfollow_count = unfollow_count + excluded.unfollow_count,
+        updated_at = {_NOW_SQL};
+end;
+"""
+
+# Methods each table's policies allow (schema.sql RLS: owner rows only)
+POLICIES = {
+    "imports": {"GET", "HEAD", "POST", "PATCH", "DELETE"},
+    "followers": {"GET", "HEAD", "POST", "PATCH", "DELETE"},
+    "events": {"GET", "HEAD", "POST", "PATCH", "DELETE"},
+    "import_staging": {"GET", "HEAD", "POST", "PATCH", "DELETE"},
+    "user_stats": {"GET", "HEAD"},
+    "import_metrics": {"GET", "HEAD", "POST"},
+    "follower_checkpoints": {"GET", "HEAD", "POST", "PATCH", "DELETE"},
+    "event_daily": {"GET", "HEAD", "POST", "PATCH", "DELETE"},
+}
+# Default of the {{checkpoint_interval}} template parameter; pass the variant's
+# value to Database / --checkpoint-interval
+CHECKPOINT_INTERVAL = 10
+
+_OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns", "or", "and"}
+
+
+class ApiError(Exception):
+    """A PostgREST-shaped error: HTTP status plus the JSON body fields."""
+
+    def __init__(self, status, code, message, details=None, hint=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.details = details
+        self.hint = hint
+
+    def body(self):
+        return {"code": self.code, "message": self.message, "details": self.details, "hint": self.hint}
+
+
+def now_iso():
+    # Same text form as the column defaults, so timestamps compare as strings
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "+00:00"
+
+
+def make_token(user_id):
+    """Unsigned JWT whose ``sub`` is ``user_id``; enough for this server, not for Supabase."""
+    enc = lambda obj: base64.urlsafe_b64encode(json.dumps(obj).encode()).rstrip(b"=").decode()
+    return f"{enc({'alg': 'none', 'typ': 'JWT'})}.{enc({'sub': user_id, 'role': 'authenticated'})}."
+
+
+def _token_sub(authorization):
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    parts = authorization[7:].strip().split(".")
+    if len(parts) < 2:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+    except ValueError:
+        return None
+    return payload.get("sub") if isinstance(payload, dict) else None
+
+
+# --- filters -------------------------------------------------------------------------
+
+def _split_top(text):
+    # Split on commas outside parentheses and double quotes
+    parts, depth, quoted, start, i = [], 0, False, 0, 0
+    while i < len(text):
+        ch = text[i]
+        if quoted:
+            if ch == "\\":
+                i += 1
+            elif ch == '"':
+                quoted = False
+        elif ch == '"':
+            quoted = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return [p for p in parts if p]
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+class _Filters:
+    """Builds a SQL ``where`` from PostgREST filter syntax, checking column names."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.sql = []
+        self.params = []
+
+    def column(self, name):
+        if name not in self.columns:
+            raise ApiError(400, "42703", f"column \"{name}\" does not exist")
+        return name
+
+    def condition(self, column, expr):
+        # expr is "op.value" or "not.op.value"
+        negate = expr.startswith("not.")
+        if negate:
+            expr = expr[4:]
+        op, _, value = expr.partition(".")
+        col = self.column(column)
+        if op in _OPERATORS:
+            sql = f"{col} {_OPERATORS[op]} ?"
+            params = [_unquote(value)]
+        elif op in ("like", "ilike"):
+            sql = f"{col} like ?" if op == "like" else f"lower({col}) like lower(?)"
+            params = [_unquote(value).replace("*", "%")]
+        elif op == "in":
+            items = [_unquote(v) for v in _split_top(value.strip("()"))]
+            sql = f"{col} in ({', '.join('?' * len(items))})" if items else "0"
+            params = items
+        elif op == "is":
+            literal = {"null": "null", "true": "1", "false": "0"}.get(value.lower())
+            if literal is None:
+                raise ApiError(400, "PGRST100", f"invalid is value: {value}")
+            sql = f"{col} is {literal}"
+            params = []
+        else:
+            raise ApiError(400, "PGRST100", f"unsupported operator: {op}")
+        return (f"not ({sql})" if negate else sql), params
+
+    def tree(self, joiner, body):
+        # body: "(a.eq.1,and(b.lt.2,c.gt.3))"
+        if not (body.startswith("(") and body.endswith(")")):
+            raise ApiError(400, "PGRST100", f"invalid logic tree: {body}")
+        sqls, params = [], []
+        for item in _split_top(body[1:-1]):
+            negate = item.startswith("not.")
+            if negate:
+                item = item[4:]
+            m = re.match(r"^(and|or)(\(.*\))$", item)
+            if m:
+                sql, p = self.tree(m.group(1), m.group(2))
+            else:
+                column, _, expr = item.partition(".")
+                sql, p = self.condition(column, expr)
+            sqls.append(f"not ({sql})" if negate else sql)
+            params += p
+        return "(" + f" {joiner} ".join(sqls) + ")", params
+
+    def add(self, key, value):
+        if key in ("or", "and"):
+            sql, params = self.tree(key, value)
+        else:
+            sql, params = self.condition(key, value)
+        self.sql.append(sql)
+        self.params += params
+
+    def where(self):
+        return (" where " + " and ".join(self.sql)) if self.sql else ""
+
+
+# --- database ------------------------------------------------------------------------
+
+class _Connection(sqlite3.Connection):
+    # RPCs only get the connection; it carries the rendered schema parameters
+    checkpoint_interval = CHECKPOINT_INTERVAL
+
+
+class Database:
+    """SQLite behind one lock: requests are serialised like a single writer."""
+
+    def __init__(self, path=":memory:", checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.conn = sqlite3.connect(path, check_same_thread=False, factory=_Connection)
+        self.conn.checkpoint_interval = checkpoint_interval
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("pragma foreign_keys = on")
+        self.conn.execute("pragma journal_mode = wal")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.tables = {
+            name: [r["name"] for r in self.conn.execute(f"pragma table_info({name})")]
+            for name in POLICIES
+        }
+        self.primary_keys = {
+            name: [r["name"] for r in sorted(self.conn.execute(f"pragma table_info({name})"), key=lambda r: r["pk"]) if r["pk"]]
+            for name in POLICIES
+        }
+
+    def transaction(self, fn, *args):
+        with self.lock:
+            try:
+                with self.conn:
+                    return fn(self.conn, *args)
+            except sqlite3.IntegrityError as e:
+                text = str(e)
+                if "UNIQUE" in text:
+                    raise ApiError(409, "23505", f"duplicate key value violates unique constraint ({text})")
+                if "FOREIGN KEY" in text:
+                    raise ApiError(409, "23503", "insert or update violates foreign key constraint")
+                if "NOT NULL" in text:
+                    raise ApiError(400, "23502", text)
+                raise ApiError(400, "23514", text)
+
+
+def _select_list(select, columns):
+    if not select or select == "*":
+        return list(columns)
+    names = [c.strip() for c in select.split(",") if c.strip()]
+    for name in names:
+        if name not in columns:
+            raise ApiError(400, "42703", f"column \"{name}\" does not exist")
+    return names
+
+
+def _order_by(order, columns):
+    terms = []
+    for term in order.split(","):
+        col, *mods = term.strip().split(".")
+        if col not in columns:
+            raise ApiError(400, "42703", f"column \"{col}\" does not exist")
+        sql = col
+        for mod in mods:
+            sql += {"asc": " asc", "desc": " desc", "nullsfirst": " nulls first", "nullslast": " nulls last"}.get(mod, "")
+        terms.append(sql)
+    return " order by " + ", ".join(terms)
+
+
+def _rows(cursor, names):
+    return [{k: row[k] for k in names} for row in cursor]
+
+
+# --- RPCs (plpgsql functions of schema.sql) ------------------------------------------
+
+def _own_import(db, uid, import_id):
+    if db.execute("select 1 from imports where id = ? and user_id = ?", (import_id, uid)).fetchone() is None:
+        raise ApiError(400, "P0001", f"import {import_id} not found")
+
+
+def latest_finalized_import(db, uid):
+    row = db.execute(
+        "select id from imports where user_id = ? and finalized_at is not null"
+        " order by finalized_at desc, id desc limit 1", (uid,),
+    ).fetchone()
+    return None if row is None else row[0]
+
+
+def _insert_unfollows(db, uid, now, import_id, gone):
+    db.executemany(
+        "insert into events (user_id, username, type, happened_at, import_id) values (?, ?, 'unfollow', ?, ?)",
+        [(uid, username, now, import_id) for (username,) in gone],
+    )
+
+
+def _close_import(db, uid, now, import_id):
+    db.execute("update imports set finalized_at = ? where id = ?", (now, import_id))
+    db.execute("delete from import_staging where import_id = ?", (import_id,))
+    checkpoint_followers(db, uid, import_id)
+
+
+def checkpoint_followers(db, uid, p_import_id):
+    return checkpoint_user_followers(db, uid, uid, p_import_id)
+
+
+def checkpoint_user_followers(db, uid, p_user_id, p_import_id):
+    if p_user_id != uid:
+        raise ApiError(403, "42501", 'new row violates row-level security policy for table "follower_checkpoints"')
+    last = db.execute("select max(import_id) from follower_checkpoints where user_id = ?", (uid,)).fetchone()[0]
+    if last is not None:
+        since = db.execute(
+            "select count(*) from imports where user_id = ? and finalized_at is not null and id > ? and id <= ?",
+            (uid, last, p_import_id),
+        ).fetchone()[0]
+        if since < db.checkpoint_interval:
+            return False
+    usernames = [r[0] for r in db.execute(
+        "select username from followers where user_id = ? and last_status = 'current' order by username", (uid,),
+    )]
+    db.execute(
+        "insert into follower_checkpoints (user_id, import_id, usernames) values (?, ?, ?) on conflict do nothing",
+        (uid, p_import_id, json.dumps(usernames)),
+    )
+    return True
+
+
+def record_event_daily(db, uid, p_user_id, p_at, p_follows, p_unfollows, p_follower_count):
+    if p_user_id != uid:
+        raise ApiError(403, "42501", 'new row violates row-level security policy for table "event_daily"')
+    db.execute(
+        """insert into event_daily (user_id, day, follows, unfollows, follower_count) values (?, ?, ?, ?, ?)
+           on conflict (user_id, day) do update
+             set follows = follows + excluded.follows, unfollows = unfollows + excluded.unfollows,
+                 follower_count = excluded.follower_count""",
+        (uid, p_at[:10], p_follows, p_unfollows, p_follower_count),
+    )
+    return None
+
+
+def home_stats(db, uid, p_days=30):
+    row = db.execute("select follower_count, follow_count, unfollow_count from user_stats where user_id = ?",
+                     (uid,)).fetchone()
+    since = (datetime.now(timezone.utc) - timedelta(days=p_days)).strftime("%Y-%m-%d")
+    follows, unfollows = db.execute(
+        "select coalesce(sum(follows), 0), coalesce(sum(unfollows), 0) from event_daily where user_id = ? and day >= ?",
+        (uid, since),
+    ).fetchone()
+    counts = tuple(row) if row is not None else (0, 0, 0)
+    return [dict(zip(("follower_count", "follow_count", "unfollow_count"), counts),
+                 recent_follows=follows, recent_unfollows=unfollows)]
+
+
+def followers_as_of(db, uid, p_import_id):
+    row = db.execute(
+        "select import_id, usernames from follower_checkpoints where user_id = ? and import_id <= ?"
+        " order by import_id desc limit 1", (uid, p_import_id),
+    ).fetchone()
+    base, followers = (0, set()) if row is None else (row[0], set(json.loads(row[1])))
+    for username, type_ in db.execute(
+        "select username, type from events where user_id = ? and import_id > ? and import_id <= ? order by id",
+        (uid, base, p_import_id),
+    ):
+        if type_ == "follow":
+            followers.add(username)
+        else:
+            followers.discard(username)
+    return sorted(followers)
+
+
+def finalize_import(db, uid, p_import_id):
+    _own_import(db, uid, p_import_id)
+    now = now_iso()
+    entered = db.execute(
+        """insert into events (user_id, username, type, happened_at, import_id)
+           select ?, s.username, 'follow', ?, ? from import_staging s
+            where s.import_id = ?
+              and not exists (select 1 from followers f
+                               where f.user_id = ? and f.username = s.username and f.last_status = 'current')""",
+        (uid, now, p_import_id, p_import_id, uid),
+    ).rowcount
+    gone = db.execute(
+        """update followers set last_seen = ?, last_status = 'left'
+            where user_id = ? and last_status = 'current'
+              and not exists (select 1 from import_staging s
+                               where s.import_id = ? and s.username = followers.username)
+           returning username""",
+        (now, uid, p_import_id),
+    ).fetchall()
+    _insert_unfollows(db, uid, now, p_import_id, gone)
+    follower_count = db.execute(
+        """insert into followers (user_id, username, first_seen, last_seen, last_status)
+           select ?, s.username, ?, ?, 'current' from import_staging s where s.import_id = ? and true
+           on conflict (user_id, username) do update
+             set last_seen = excluded.last_seen, last_status = 'current'""",
+        (uid, now, now, p_import_id),
+    ).rowcount
+    _close_import(db, uid, now, p_import_id)
+    record_event_daily(db, uid, uid, now, entered, len(gone), follower_count)
+    return [{"entered_count": entered, "left_count": len(gone), "follower_count": follower_count}]
+
+
+def finalize_import_delta(db, uid, p_import_id, p_base_import_id):
+    _own_import(db, uid, p_import_id)
+    if latest_finalized_import(db, uid) != p_base_import_id:
+        raise ApiError(400, "IG001", f"import {p_base_import_id} is not the latest snapshot")
+    now = now_iso()
+    entered = db.execute(
+        """insert into events (user_id, username, type, happened_at, import_id)
+           select ?, username, 'follow', ?, ? from import_staging where import_id = ? and change = 'enter'""",
+        (uid, now, p_import_id, p_import_id),
+    ).rowcount
+    gone = db.execute(
+        """update followers set last_seen = ?, last_status = 'left'
+            where user_id = ? and last_status = 'current'
+              and username in (select username from import_staging where import_id = ? and change = 'leave')
+           returning username""",
+        (now, uid, p_import_id),
+    ).fetchall()
+    _insert_unfollows(db, uid, now, p_import_id, gone)
+    db.execute(
+        """insert into followers (user_id, username, first_seen, last_seen, last_status)
+           select ?, username, ?, ?, 'current' from import_staging where import_id = ? and change = 'enter'
+           on conflict (user_id, username) do update
+             set last_seen = excluded.last_seen, last_status = 'current'""",
+        (uid, now, now, p_import_id),
+    )
+    row = db.execute("select follower_count from user_stats where user_id = ?", (uid,)).fetchone()
+    follower_count = row[0] if row else 0
+    _close_import(db, uid, now, p_import_id)
+    record_event_daily(db, uid, uid, now, entered, len(gone), follower_count)
+    return [{"entered_count": entered, "left_count": len(gone), "follower_count": follower_count}]
+
+
+RPCS = {
+    "finalize_import": finalize_import,
+    "finalize_import_delta": finalize_import_delta,
+    "latest_finalized_import": latest_finalized_import,
+    "checkpoint_followers": checkpoint_followers,
+    "checkpoint_user_followers": checkpoint_user_followers,
+    "followers_as_of": followers_as_of,
+    "home_stats": home_stats,
+    "record_event_daily": record_event_daily,
+}
+
+
+# --- request statistics --------------------------------------------------------------
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class RequestStats:
+    """Round trips and latency per route ("POST /import_staging", "POST /rpc/finalize_import")."""
+
+    def __init__(self, log_path=None):
+        self.lock = threading.Lock()
+        self.log = open(log_path, "a", encoding="utf-8") if log_path else None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.latencies = defaultdict(list)
+            self.rows = defaultdict(int)
+            self.errors = defaultdict(int)
+            self.bytes_in = defaultdict(int)
+
+    def record(self, route, ms, rows, status, bytes_in):
+        with self.lock:
+            self.latencies[route].append(ms)
+            self.rows[route] += rows
+            self.bytes_in[route] += bytes_in
+            if status >= 400:
+                self.errors[route] += 1
+            if self.log:
+                self.log.write(json.dumps({"route": route, "ms": round(ms, 3), "rows": rows, "status": status,
+                                           "bytes_in": bytes_in}) + "\n")
+                self.log.flush()
+
+    def summary(self):
+        with self.lock:
+            routes = {}
+            for route, values in sorted(self.latencies.items()):
+                ordered = sorted(values)
+                routes[route] = {
+                    "requests": len(ordered),
+                    "errors": self.errors[route],
+                    "rows": self.rows[route],
+                    "bytes_in": self.bytes_in[route],
+                    "p50_ms": round(_percentile(ordered, 0.5), 3),
+                    "p95_ms": round(_percentile(ordered, 0.95), 3),
+                    "max_ms": round(ordered[-1], 3),
+                    "total_ms": round(sum(ordered), 3),
+                }
+            return {"requests": sum(r["requests"] for r in routes.values()), "routes": routes}
+
+
+# --- HTTP ----------------------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the Supabase client
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_HEAD(self):
+        self._handle("HEAD")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        route = f"{method} {url.path.removeprefix('/rest/v1')}"
+        headers, rows = {}, 0
+        try:
+            if self.server.latency_ms:
+                time.sleep(self.server.latency_ms / 1000)
+            if url.path == "/__stats" and method == "GET":
+                status, body = 200, self.server.stats.summary()
+            elif url.path == "/__reset" and method == "POST":
+                self.server.stats.reset()
+                status, body = 204, None
+            elif url.path.startswith("/rest/v1/"):
+                status, body, headers, rows = self._rest(method, url.path[len("/rest/v1/"):], url.query, raw)
+            else:
+                raise ApiError(404, "PGRST125", f"invalid path: {url.path}")
+        except ApiError as e:
+            status, body = e.status, e.body()
+        except (ValueError, TypeError) as e:
+            status, body = 400, ApiError(400, "PGRST102", str(e)).body()
+
+        payload = b"" if body is None or method == "HEAD" else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", OBJECT_MEDIA_TYPE if self._singular() and status < 400 else "application/json")
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+        if not url.path.startswith("/__"):
+            self.server.stats.record(route, (time.perf_counter() - started) * 1000, rows, status, len(raw))
+
+    def _singular(self):
+        return OBJECT_MEDIA_TYPE in (self.headers.get("Accept") or "")
+
+    def _prefer(self):
+        prefs = {}
+        for item in (self.headers.get("Prefer") or "").split(","):
+            key, _, value = item.strip().partition("=")
+            if key:
+                prefs[key] = value
+        return prefs
+
+    def _shape(self, rows):
+        # Array, or one object for Accept: application/vnd.pgrst.object+json
+        if not self._singular():
+            return rows
+        if len(rows) != 1:
+            raise ApiError(406, "PGRST116", "JSON object requested, multiple (or no) rows returned",
+                           details=f"The result contains {len(rows)} rows")
+        return rows[0]
+
+    def _rest(self, method, name, query, raw):
+        uid = _token_sub(self.headers.get("Authorization"))
+        if uid is None:
+            raise ApiError(401, "PGRST301", "JWT missing or without sub")
+        params = parse_qsl(query, keep_blank_values=True)
+        body = json.loads(raw) if raw else None
+        db = self.server.db
+
+        if name.startswith("rpc/"):
+            fn = RPCS.get(name[4:])
+            if fn is None or method != "POST":
+                raise ApiError(404, "PGRST202", f"Could not find the function public.{name[4:]}")
+            result = db.transaction(lambda conn: fn(conn, uid, **(body or {})))
+            if isinstance(result, list):
+                return 200, self._shape(result), {}, len(result)
+            return 200, result, {}, 1
+
+        if name not in POLICIES:
+            raise ApiError(404, "42P01", f"relation \"public.{name}\" does not exist")
+        if method not in POLICIES[name]:
+            raise ApiError(403, "42501", f"permission denied for table {name}")
+        columns = db.tables[name]
+        options = dict((k, v) for k, v in params if k in _RESERVED_PARAMS and k not in ("or", "and"))
+        filters = _Filters(columns)
+        filters.add("user_id", f"eq.{uid}")  # RLS: user_id = auth.uid()
+        for k, v in params:
+            if k not in _RESERVED_PARAMS or k in ("or", "and"):
+                filters.add(k, v)
+        select = _select_list(options.get("select"), columns)
+        prefer = self._prefer()
+        representation = prefer.get("return") == "representation"
+
+        if method in ("GET", "HEAD"):
+            return self._read(db, name, filters, select, options, prefer)
+        if method == "POST":
+            rows = body if isinstance(body, list) else [body]
+            result = db.transaction(
+                self._insert, name, columns, db.primary_keys[name], rows, uid, options, prefer, select, representation,
+            )
+        elif method == "PATCH":
+            if not isinstance(body, dict) or not body:
+                raise ApiError(400, "PGRST102", "PATCH body must be a JSON object")
+            result = db.transaction(self._update, name, columns, body, uid, filters, select)
+        else:
+            result = db.transaction(self._delete, name, filters, select)
+        if not representation:
+            return (201 if method == "POST" else 204), None, {}, len(result) if isinstance(result, list) else result
+        return (201 if method == "POST" else 200), self._shape(result), {}, len(result)
+
+    def _read(self, db, name, filters, select, options, prefer):
+        sql = f"select {', '.join(select)} from {name}{filters.where()}"
+        if "order" in options:
+            sql += _order_by(options["order"], db.tables[name])
+        limit, offset = options.get("limit"), options.get("offset")
+        if limit is not None or offset is not None:
+            sql += " limit ? offset ?"
+            page = [int(limit) if limit is not None else -1, int(offset or 0)]
+        else:
+            page = []
+
+        def read(conn):
+            rows = _rows(conn.execute(sql, filters.params + page), select)
+            total = "*"
+            if prefer.get("count") in ("exact", "planned", "estimated"):
+                total = conn.execute(f"select count(*) from {name}{filters.where()}", filters.params).fetchone()[0]
+            return rows, total
+
+        rows, total = db.transaction(read)
+        first = int(offset or 0)
+        headers = {"Content-Range": f"{first}-{first + len(rows) - 1}/{total}" if rows else f"*/{total}"}
+        return 200, self._shape(rows), headers, len(rows)
+
+    @staticmethod
+    def _insert(conn, name, columns, primary_key, rows, uid, options, prefer, select, representation):
+        if not rows:
+            return []
+        for row in rows:
+            if not isinstance(row, dict):
+                raise ApiError(400, "PGRST102", "insert body must be an object or a list of objects")
+            if row.get("user_id") != uid:
+                raise ApiError(403, "42501", f"new row violates row-level security policy for table \"{name}\"")
+            for key in row:
+                if key not in columns:
+                    raise ApiError(400, "PGRST204", f"Could not find the '{key}' column of '{name}'")
+
+        resolution = prefer.get("resolution")
+        conflict = ""
+        if resolution:
+            target = options.get("on_conflict") or ",".join(primary_key)
+            target_cols = [c.strip() for c in target.split(",")]
+            for c in target_cols:
+                if c not in columns:
+                    raise ApiError(400, "42703", f"column \"{c}\" does not exist")
+            conflict = f" on conflict ({', '.join(target_cols)}) do "
+            if resolution == "ignore-duplicates":
+                conflict += "nothing"
+        returning = f" returning {', '.join(select)}" if representation else ""
+
+        # Rows with the same keys share one statement; absent keys take the column default
+        by_keys = defaultdict(list)
+        for row in rows:
+            by_keys[tuple(row)].append(row)
+        out, changed = [], 0
+        for keys, group in by_keys.items():
+            sql = f"insert into {name} ({', '.join(keys)}) values ({', '.join('?' * len(keys))})"
+            if resolution == "merge-duplicates":
+                updates = [k for k in keys if k not in target_cols]
+                sql += conflict + ("update set " + ", ".join(f"{k} = excluded.{k}" for k in updates) if updates else "nothing")
+            else:
+                sql += conflict
+            values = [tuple(row[k] for k in keys) for row in group]
+            if returning:
+                for v in values:
+                    out += _rows(conn.execute(sql + returning, v), select)
+            else:
+                before = conn.total_changes
+                conn.executemany(sql, values)
+                changed += conn.total_changes - before
+        return out if representation else changed
+
+    @staticmethod
+    def _update(conn, name, columns, body, uid, filters, select):
+        for key in body:
+            if key not in columns:
+                raise ApiError(400, "PGRST204", f"Could not find the '{key}' column of '{name}'")
+        if "user_id" in body and body["user_id"] != uid:
+            raise ApiError(403, "42501", f"new row violates row-level security policy for table \"{name}\"")
+        sets = ", ".join(f"{k} = ?" for k in body)
+        sql = f"update {name} set {sets}{filters.where()} returning {', '.join(select)}"
+        return _rows(conn.execute(sql, list(body.values()) + filters.params), select)
+
+    @staticmethod
+    def _delete(conn, name, filters, select):
+        return _rows(conn.execute(f"delete from {name}{filters.where()} returning {', '.join(select)}", filters.params), select)
+
+
+class LocalPostgrest(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, db, latency_ms=0, log_path=None):
+        super().__init__(address, _Handler)
+        self.db = db
+        self.latency_ms = latency_ms
+        self.stats = RequestStats(log_path)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve_in_thread(db_path=":memory:", host="127.0.0.1", port=0, latency_ms=0, log_path=None,
+                    checkpoint_interval=CHECKPOINT_INTERVAL):
+    """Start a server on a background thread (port 0 picks a free one); call shutdown() when done."""
+    server = LocalPostgrest((host, port), Database(db_path, checkpoint_interval), latency_ms, log_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="PostgREST local (SQLite) com o schema do app, para testes de carga.")
+    ap.add_argument("--db", default=":memory:", help="arquivo SQLite (padrão: em memória)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=54321, help="porta (54321 é a do `supabase start`)")
+    ap.add_argument("--latency-ms", type=float, default=0, help="atraso artificial por requisição (rede)")
+    ap.add_argument("--log", help="arquivo JSONL com uma linha por requisição")
+    ap.add_argument("--checkpoint-interval", type=int, default=CHECKPOINT_INTERVAL,
+                    help="checkpoint_interval da variante gerada (imports entre checkpoints)")
+    args = ap.parse_args()
+    server = LocalPostgrest((args.host, args.port), Database(args.db, args.checkpoint_interval), args.latency_ms, args.log)
+    print(f"PostgREST local em {server.url}/rest/v1 (estatísticas em {server.url}/__stats)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
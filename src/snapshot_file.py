@@ -0,0 +1,117 @@
+# Memory-mapped binary snapshot files (one per imports.id)
+#
+# Layout, all integers little-endian:
+#
+#   header   64 bytes  magic "IGSNAP\0\0", version, flags, count, import_id,
+#                      hashes_off, offsets_off, blob_off, blob_len
+#   hashes   count x u64        sorted blake2b-64 username hashes
+#   offsets  (count + 1) x u64  start of each username in blob
+#   blob     blob_len bytes     UTF-8 usernames, in hash order
+#
+# Opening a file only maps it and reads the header; the columns are used in
+# place, so membership tests and diffs never deserialise the snapshot.
+
+import mmap, os, struct, sys
+from array import array
+
+from snapshot_diff import Snapshot
+
+MAGIC = b"IGSNAP\0\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQqQQQQ")
+NO_IMPORT = -1
+
+
+def _le_bytes(col):
+    if sys.byteorder == "little":
+        return memoryview(col).cast("B")
+    col = array("Q", col)
+    col.byteswap()
+    return col.tobytes()
+
+
+def write_snapshot(path, snapshot, import_id=None):
+    count = len(snapshot)
+    hashes_off = HEADER.size
+    offsets_off = hashes_off + 8 * count
+    blob_off = offsets_off + 8 * (count + 1)
+    blob_len = len(snapshot.blob)
+    total = blob_off + blob_len
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, count, NO_IMPORT if import_id is None else import_id,
+        hashes_off, offsets_off, blob_off, blob_len,
+    )
+    tmp = f"{path}.tmp"
+    with open(tmp, "w+b") as f:
+        f.truncate(total)
+        with mmap.mmap(f.fileno(), total) as mm:
+            mm[0:hashes_off] = header
+            mm[hashes_off:offsets_off] = _le_bytes(snapshot.hashes)
+            mm[offsets_off:blob_off] = _le_bytes(snapshot.offsets)
+            mm[blob_off:total] = snapshot.blob
+            mm.flush()
+    os.replace(tmp, path)
+
+
+class SnapshotFile(Snapshot):
+    """A ``Snapshot`` whose columns are views over a read-only memory map."""
+
+    __slots__ = ("import_id", "_file", "_mm")
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"snapshot vazio ou inválido: {path}")
+        try:
+            if len(self._mm) < HEADER.size:
+                raise ValueError(f"snapshot truncado ou corrompido: {path}")
+            magic, version, _flags, count, import_id, hashes_off, offsets_off, blob_off, blob_len = (
+                HEADER.unpack_from(self._mm, 0)
+            )
+            if magic != MAGIC:
+                raise ValueError(f"não é um snapshot: {path}")
+            if version != VERSION:
+                raise ValueError(f"versão de snapshot não suportada: {version}")
+            # The sections follow each other in a fixed order, so the header fully
+            # determines the size; anything else is a truncated or corrupt file
+            if (hashes_off != HEADER.size or offsets_off != hashes_off + 8 * count
+                    or blob_off != offsets_off + 8 * (count + 1) or blob_off + blob_len != len(self._mm)):
+                raise ValueError(f"snapshot truncado ou corrompido: {path}")
+            first, last = (struct.unpack_from("<Q", self._mm, off)[0] for off in (offsets_off, blob_off - 8))
+            if first != 0 or last != blob_len:
+                raise ValueError(f"snapshot corrompido (offsets): {path}")
+        except ValueError:
+            self.close()
+            raise
+        self.import_id = None if import_id == NO_IMPORT else import_id
+        view = memoryview(self._mm)
+        hashes = view[hashes_off:offsets_off].cast("Q")
+        offsets = view[offsets_off:blob_off].cast("Q")
+        if sys.byteorder != "little":
+            hashes, offsets = array("Q", hashes), array("Q", offsets)
+            hashes.byteswap()
+            offsets.byteswap()
+        super().__init__(hashes, offsets, view[blob_off:blob_off + blob_len])
+
+    def close(self):
+        # Views must be released before the map can be closed
+        for col in (getattr(self, "hashes", None), getattr(self, "offsets", None), getattr(self, "blob", None)):
+            if isinstance(col, memoryview):
+                col.release()
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_snapshot(path):
+    return SnapshotFile(path)
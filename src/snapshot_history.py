@@ -0,0 +1,93 @@
+# Follower history of one account: a delta per import, a checkpoint every K imports
+#
+# Layout under <root>/<user_id>/ (mirrors follower_checkpoints + events in schema.sql):
+#
+#   <import_id>.igsnap   checkpoint, the full snapshot (snapshot_file format)
+#   <import_id>.delta    gzip'd text, one "+username" / "-username" per line
+#
+# as_of(import_id) opens the nearest checkpoint at or before the import and
+# applies at most K deltas, so a lookup never replays the whole history.
+
+import argparse, gzip, os, re, sys
+
+import snapshot_diff, snapshot_file
+
+DEFAULT_INTERVAL = 10
+_ENTRY = re.compile(r"^(\d+)\.(igsnap|delta)$")
+
+
+class SnapshotHistory:
+    def __init__(self, root, user_id, interval=DEFAULT_INTERVAL):
+        self.dir = os.path.join(root, user_id)
+        self.interval = interval
+
+    def _entries(self):
+        # {import_id: "igsnap" | "delta"}, checkpoints win over deltas
+        entries = {}
+        if os.path.isdir(self.dir):
+            for name in os.listdir(self.dir):
+                m = _ENTRY.match(name)
+                if m and entries.get(int(m.group(1))) != "igsnap":
+                    entries[int(m.group(1))] = m.group(2)
+        return entries
+
+    def imports(self):
+        return sorted(self._entries())
+
+    def discard_from(self, import_id):
+        """Forget ``import_id`` and every later import, so they can be recorded again."""
+        for i, kind in self._entries().items():
+            if i >= import_id:
+                for ext in ("igsnap", "delta"):
+                    path = os.path.join(self.dir, f"{i}.{ext}")
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    def record(self, import_id, diff):
+        """Store an import from its ``SnapshotDiff``: a checkpoint on the first import and
+        every ``interval`` imports after the last one, a delta otherwise."""
+        os.makedirs(self.dir, exist_ok=True)
+        entries = self._entries()
+        last = max((i for i, kind in entries.items() if kind == "igsnap" and i < import_id), default=None)
+        if last is None or sum(1 for i in entries if last < i < import_id) + 1 >= self.interval:
+            snapshot_file.write_snapshot(os.path.join(self.dir, f"{import_id}.igsnap"), diff.now, import_id)
+            return True
+        path = os.path.join(self.dir, f"{import_id}.delta")
+        with gzip.open(f"{path}.tmp", "wt", encoding="utf-8", newline="\n") as f:
+            f.writelines(f"+{u}\n" for u in diff.entered)
+            f.writelines(f"-{u}\n" for u in diff.left)
+        os.replace(f"{path}.tmp", path)
+        return False
+
+    def as_of(self, import_id):
+        """The follower ``Snapshot`` right after ``import_id`` (or the latest import before it)."""
+        entries = self._entries()
+        base = max((i for i, kind in entries.items() if kind == "igsnap" and i <= import_id), default=None)
+        if base is None:
+            raise ValueError(f"nenhum checkpoint até o import {import_id}")
+        with snapshot_file.open_snapshot(os.path.join(self.dir, f"{base}.igsnap")) as cp:
+            followers = set(cp.usernames())
+        for i in sorted(i for i in entries if base < i <= import_id):
+            with gzip.open(os.path.join(self.dir, f"{i}.delta"), "rt", encoding="utf-8") as f:
+                for line in f:
+                    username = line[1:].rstrip("\n")
+                    if line[0] == "+":
+                        followers.add(username)
+                    else:
+                        followers.discard(username)
+        return snapshot_diff.Snapshot.from_usernames(sorted(followers))
+
+
+def followers_as_of(root, user_id, import_id):
+    return SnapshotHistory(root, user_id).as_of(import_id)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Seguidores de uma conta como estavam em um import (um por linha).")
+    ap.add_argument("root", help="diretório do histórico (<snapshots>/history)")
+    ap.add_argument("user_id")
+    ap.add_argument("import_id", type=int)
+    args = ap.parse_args()
+    out = sys.stdout
+    for username in followers_as_of(args.root, args.user_id, args.import_id).usernames():
+        out.write(username + "\n")
@@ -0,0 +1,4 @@
+# The modules under test live flat in src/ and import each other by name
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
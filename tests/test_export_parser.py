@@ -0,0 +1,117 @@
+import io, json, zipfile
+
+import pytest
+
+import export_parser
+
+
+class CountingReader(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def _item(i):
+    return {
+        "title": "",
+        "media_list_data": [],
+        "string_list_data": [{"href": f"https://www.instagram.com/usér_{i}", "value": f"q\"\\u{i}\U0001F600", "timestamp": 1700000000 + i}],
+        "flags": [True, False, None, -1.5e3],
+    }
+
+
+ITEMS = [_item(i) for i in range(30)]
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_array_items_across_every_chunk_boundary(ensure_ascii):
+    data = json.dumps(ITEMS, ensure_ascii=ensure_ascii).encode()
+    for chunk_size in range(1, 64):
+        stream = export_parser._JsonStream(io.BytesIO(data), chunk_size=chunk_size)
+        assert list(stream.array_items()) == ITEMS, chunk_size
+
+
+def test_scalars_cut_at_the_chunk_end_are_completed():
+    data = b"[12345, true, false, null, \"\\u00e9\"]"
+    for chunk_size in range(1, len(data)):
+        stream = export_parser._JsonStream(io.BytesIO(data), chunk_size=chunk_size)
+        assert list(stream.array_items()) == [12345, True, False, None, "é"]
+
+
+def test_followers_key_of_an_object_and_other_keys_skipped():
+    doc = {"other": {"followers": [1]}, "followers": [{"username": "Ann"}, {"username": "bob"}], "z": [1, 2]}
+    raw = io.BytesIO(json.dumps(doc).encode())
+    assert list(export_parser.parse_followers_json(raw)) == ["ann", "bob"]
+
+
+def test_href_value_and_username_shapes():
+    doc = [
+        {"string_list_data": [{"href": "https://www.instagram.com/Alice/"}]},
+        {"string_list_data": [{"href": "https://www.instagram.com/caf%C3%A9/"}]},
+        {"string_list_data": [{"value": "Bob"}]},
+        {"username": "Carol"},
+        {"string_list_data": []},
+        "not an object",
+    ]
+    raw = io.BytesIO(json.dumps(doc).encode())
+    assert list(export_parser.parse_followers_json(raw)) == ["alice", "café", "bob", "carol"]
+
+
+def test_malformed_entry_fails_without_reading_the_rest():
+    body = b",".join(json.dumps(item).encode() for item in ITEMS * 2000)
+    raw = CountingReader(b'[{"username": oops},' + body + b"]")
+    with pytest.raises(ValueError):
+        list(export_parser.parse_followers_json(raw))
+    assert raw.bytes_read <= 2 * export_parser.CHUNK_SIZE < len(raw.getvalue())
+
+
+def test_csv_quoted_fields_and_header_choice():
+    data = 'Nome,"Profile URL"\n"Smith, Ann","https://www.instagram.com/ann/"\n"multi\nline",https://www.instagram.com/Bob\n'
+    assert list(export_parser.parse_followers_csv(io.BytesIO(data.encode()))) == ["ann", "bob"]
+    data = "\ufeffusername,x\nAnn,1\n,2\n"
+    assert list(export_parser.parse_followers_csv(io.BytesIO(data.encode()))) == ["ann"]
+
+
+def test_select_members_orders_parts_by_number():
+    names = [
+        "media/posts_1.json",
+        "connections/followers_and_following/followers_10.json",
+        "connections/followers_and_following/following.json",
+        "connections/followers_and_following/followers_2.json",
+        "connections\\followers_and_following\\followers_1.json",
+    ]
+    assert export_parser.select_members(names) == [4, 3, 1]
+
+
+def test_select_members_falls_back_to_following_json():
+    assert export_parser.select_members(["a/following.csv", "a/following.json", "b/x.json"]) == [1]
+    assert export_parser.select_members(["a/posts.json"]) == []
+
+
+def _zip_with_parts(path, parts):
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("media/photo.jpg", b"\0" * 100)
+        for number, names in parts:
+            z.writestr(f"followers_and_following/followers_{number}.json",
+                       json.dumps([{"string_list_data": [{"value": n}]} for n in names]))
+
+
+def test_archive_parts_are_merged_in_part_order(tmp_path):
+    path = tmp_path / "export.zip"
+    _zip_with_parts(path, [(3, ["e", "a"]), (1, ["b", "A"]), (2, ["c"])])
+    expected = ["b", "a", "c", "e"]
+    assert list(export_parser.normalize_usernames(export_parser.extract_followers_from_file(str(path)))) == expected
+    assert list(export_parser.extract_followers_parallel(str(path), max_workers=2)) == expected
+
+
+def test_archive_without_followers_member(tmp_path):
+    path = tmp_path / "export.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("media/posts_1.json", "[]")
+    with pytest.raises(ValueError):
+        list(export_parser.extract_followers_from_file(str(path)))
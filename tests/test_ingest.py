@@ -0,0 +1,96 @@
+import json, os
+from datetime import datetime, timezone
+
+import pytest
+
+import ingest, snapshot_history
+
+AT = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, "\\N"),
+    (7, "7"),
+    ("plain", "plain"),
+    ("a\\b", "a\\\\b"),
+    ("a\tb", "a\\tb"),
+    ("a\nb\r", "a\\nb\\r"),
+    ("\\N", "\\\\N"),
+])
+def test_copy_field(value, expected):
+    assert ingest.copy_field(value) == expected
+
+
+def test_copy_line_keeps_one_row_per_line():
+    assert ingest.copy_line(("u", "x\ty\nz", None)) == "u\tx\\ty\\nz\t\\N\n"
+
+
+def test_sql_literal_doubles_quotes():
+    assert ingest.sql_literal("o'brien") == "'o''brien'"
+
+
+def _export(path, names):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"string_list_data": [{"value": u}]} for u in names], f)
+    return str(path)
+
+
+def _rows(out_dir, name):
+    with open(os.path.join(out_dir, name), encoding="utf-8") as f:
+        return sorted(tuple(line.rstrip("\n").split("\t")) for line in f)
+
+
+def test_first_import_makes_every_follower_a_follow(tmp_path):
+    out = str(tmp_path / "out")
+    result = ingest.ingest(_export(tmp_path / "f.json", ["B", "a"]), "u1", 5, out, imported_at=AT)
+    assert result == {"user_id": "u1", "import_id": 5, "followers": 2, "entered": 2, "left": 0, "retained": 0}
+    at = AT.isoformat()
+    assert _rows(out, "imports.copy") == [("5", "u1", ingest.SOURCE, at, at)]
+    assert _rows(out, "followers.copy") == [("u1", "a", at, at, "current"), ("u1", "b", at, at, "current")]
+    assert _rows(out, "events.copy") == [("u1", "a", "follow", at, "5"), ("u1", "b", "follow", at, "5")]
+
+    with open(os.path.join(out, "load.sql"), encoding="utf-8") as f:
+        load = f.read()
+    assert f"select public.ensure_events_partition('{at}');" in load
+    assert f"select public.record_event_daily('u1', '{at}', 2, 0, 2);" in load
+    assert "select public.checkpoint_user_followers('u1', 5);" in load
+
+
+def test_snapshot_carries_over_between_imports(tmp_path):
+    snaps = str(tmp_path / "snaps")
+    ingest.ingest(_export(tmp_path / "1.json", ["a", "b", "c"]), "u", 1, str(tmp_path / "o1"), snaps, AT)
+    result = ingest.ingest(_export(tmp_path / "2.json", ["b", "c", "d"]), "u", 2, str(tmp_path / "o2"), snaps, AT)
+    assert (result["entered"], result["left"], result["retained"]) == (1, 1, 2)
+    types = {row[1]: row[2] for row in _rows(str(tmp_path / "o2"), "events.copy")}
+    assert types == {"d": "follow", "a": "unfollow"}
+    statuses = {row[1]: row[4] for row in _rows(str(tmp_path / "o2"), "followers.copy")}
+    assert statuses == {"b": "current", "c": "current", "d": "current", "a": "left"}
+
+
+def test_rerun_diffs_against_the_snapshot_before_it(tmp_path):
+    snaps = str(tmp_path / "snaps")
+    f1 = _export(tmp_path / "1.json", ["a", "b", "c"])
+    f2 = _export(tmp_path / "2.json", ["b", "c", "d"])
+    ingest.ingest(f1, "u", 1, str(tmp_path / "o1"), snaps, AT)
+    first = ingest.ingest(f2, "u", 2, str(tmp_path / "o2"), snaps, AT)
+    rerun = ingest.ingest(f2, "u", 2, str(tmp_path / "o2"), snaps, AT)
+    assert rerun == first
+
+    # Rerunning the first import drops the later ones from the history
+    again = ingest.ingest(f1, "u", 1, str(tmp_path / "o1"), snaps, AT)
+    assert (again["entered"], again["left"]) == (3, 0)
+    assert snapshot_history.SnapshotHistory(os.path.join(snaps, "history"), "u").imports() == [1]
+
+
+def test_batch_imported_at_follows_import_order(tmp_path):
+    account = tmp_path / "in" / "u"
+    account.mkdir(parents=True)
+    for i, (name, mtime) in enumerate([("a.json", 300), ("b.json", 100), ("c.json", 200)]):
+        path = _export(account / name, [f"x{j}" for j in range(i + 2)])
+        os.utime(path, (mtime, mtime))
+
+    accounts, summary = ingest.ingest_batch(str(tmp_path / "in"), str(tmp_path / "out"), 10, jobs=1)
+    assert summary["imports"] == 3 and summary["failed"] == 0
+    stamps = [_rows(str(tmp_path / "out" / "u" / str(r["import_id"])), "imports.copy")[0][3] for r in accounts[0]]
+    assert [r["import_id"] for r in accounts[0]] == [10, 11, 12]
+    assert stamps == sorted(stamps) and len(set(stamps)) == 1
@@ -0,0 +1,131 @@
+import pytest
+
+import postgrest_local
+from postgrest_local import ApiError, _Filters
+from bench.upload_load import OBJECT, _Client, upload
+
+COLUMNS = {"user_id", "username", "import_id", "last_status"}
+
+
+def _where(**filters):
+    f = _Filters(COLUMNS)
+    for key, value in filters.items():
+        f.add(key, value)
+    return f.where(), f.params
+
+
+@pytest.mark.parametrize("expr, sql, params", [
+    ("eq.ann", "username = ?", ["ann"]),
+    ("neq.ann", "username <> ?", ["ann"]),
+    ("gt.b", "username > ?", ["b"]),
+    ("lte.b", "username <= ?", ["b"]),
+    ("like.a*n", "username like ?", ["a%n"]),
+    ("ilike.*AN*", "lower(username) like lower(?)", ["%AN%"]),
+    ('in.(a,"b,c",d)', "username in (?, ?, ?)", ["a", "b,c", "d"]),
+    ("in.()", "0", []),
+    ("is.null", "username is null", []),
+    ("is.TRUE", "username is 1", []),
+    ("not.eq.ann", "not (username = ?)", ["ann"]),
+    ('eq."a\\"b"', "username = ?", ['a"b']),
+])
+def test_condition(expr, sql, params):
+    assert _where(username=expr) == (" where " + sql, params)
+
+
+def test_filters_are_anded():
+    assert _where(username="eq.a", import_id="gt.3") == (" where username = ? and import_id > ?", ["a", "3"])
+
+
+def test_logic_trees():
+    where, params = _where(**{"or": "(import_id.eq.1,and(username.lt.b,not.last_status.eq.left))"})
+    assert where == " where (import_id = ? or (username < ? and not (last_status = ?)))"
+    assert params == ["1", "b", "left"]
+    assert _where(**{"and": "(not.or(import_id.eq.1,import_id.eq.2))"})[0] == " where (not ((import_id = ? or import_id = ?)))"
+
+
+def test_no_filters():
+    assert _Filters(COLUMNS).where() == ""
+
+
+@pytest.mark.parametrize("key, value, code", [
+    ("missing", "eq.1", "42703"),
+    ("or", "(missing.eq.1)", "42703"),
+    ("username", "between.1", "PGRST100"),
+    ("username", "is.maybe", "PGRST100"),
+    ("or", "import_id.eq.1", "PGRST100"),
+])
+def test_invalid_filters(key, value, code):
+    with pytest.raises(ApiError) as e:
+        _where(**{key: value})
+    assert (e.value.status, e.value.code) == (400, code)
+
+
+@pytest.mark.parametrize("interval, expected", [(1, [1, 2, 3, 4, 5]), (3, [1, 4])])
+def test_upload_rounds_checkpoint_and_rebuild_history(interval, expected):
+    server = postgrest_local.serve_in_thread(checkpoint_interval=interval)
+    try:
+        uid = "00000000-0000-4000-8000-000000000001"
+        with _Client(server.url, postgrest_local.make_token(uid)) as client:
+            base, prev, rounds = None, None, []
+            for r in range(5):
+                names = [f"u{j}" for j in range(r, r + 5)]
+                base, _, _ = upload(client, uid, names, 3, base, prev)
+                rounds.append((base, names))
+                prev = names
+
+            checkpoints = client.request("GET", "/rest/v1/follower_checkpoints?select=import_id&order=import_id")
+            assert [c["import_id"] for c in checkpoints] == expected
+            for import_id, names in rounds:
+                assert client.request("POST", "/rest/v1/rpc/followers_as_of", {"p_import_id": import_id}) == names
+
+            other = "00000000-0000-4000-8000-000000000002"
+            with pytest.raises(RuntimeError, match="42501"):
+                client.request("POST", "/rest/v1/rpc/checkpoint_user_followers", {"p_user_id": other, "p_import_id": base})
+    finally:
+        server.shutdown()
+
+
+def test_latest_finalized_import_follows_finalization_order():
+    db = postgrest_local.Database()
+    uid = "00000000-0000-4000-8000-000000000001"
+    db.conn.executemany(
+        "insert into imports (id, user_id, imported_at, finalized_at) values (?, ?, ?, ?)",
+        [(1, uid, "2024-05-01T10:00:00.000+00:00", "2024-05-01T10:09:00.000+00:00"),
+         (2, uid, "2024-05-01T10:05:00.000+00:00", "2024-05-01T10:06:00.000+00:00"),
+         (3, uid, "2024-05-01T10:07:00.000+00:00", None)],
+    )
+    # Created first, finalized last: its snapshot is the one in followers
+    assert postgrest_local.latest_finalized_import(db.conn, uid) == 1
+
+
+def test_home_stats_in_one_request():
+    server = postgrest_local.serve_in_thread()
+    try:
+        uid = "00000000-0000-4000-8000-000000000001"
+        with _Client(server.url, postgrest_local.make_token(uid)) as client:
+            empty = {"follower_count": 0, "follow_count": 0, "unfollow_count": 0, "recent_follows": 0, "recent_unfollows": 0}
+            assert client.request("POST", "/rest/v1/rpc/home_stats", {}, OBJECT) == empty
+
+            base, _, _ = upload(client, uid, ["a", "b", "c"], 3)
+            upload(client, uid, ["b", "c", "d", "e"], 3, base, ["a", "b", "c"])
+            stats = client.request("POST", "/rest/v1/rpc/home_stats", {"p_days": 30}, OBJECT)
+            assert stats == {"follower_count": 4, "follow_count": 5, "unfollow_count": 1, "recent_follows": 5, "recent_unfollows": 1}
+    finally:
+        server.shutdown()
+
+
+def test_client_reuses_its_connections_across_uploads():
+    server = postgrest_local.serve_in_thread()
+    try:
+        uid = "00000000-0000-4000-8000-000000000001"
+        with _Client(server.url, postgrest_local.make_token(uid), concurrency=2) as client:
+            base, prev = None, None
+            for r in range(4):
+                names = [f"u{j}" for j in range(r, r + 20)]
+                base, _, _ = upload(client, uid, names, 3, base, prev)
+                prev = names
+            # The calling thread plus the two staging workers, not two more per upload
+            assert len(client.conns) <= 3
+        assert client.conns == []
+    finally:
+        server.shutdown()
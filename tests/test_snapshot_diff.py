@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import snapshot_diff
+from snapshot_diff import Snapshot
+
+ENGINES = ["python"] + (["numpy"] if snapshot_diff.np is not None else [])
+
+
+def _sets(seed, size, churn):
+    rng = random.Random(seed)
+    prev = {f"user_{rng.randrange(10 * size)}" for _ in range(size)}
+    now = {u for u in prev if rng.random() > churn} | {f"new_{seed}_{i}" for i in range(int(size * churn))}
+    return sorted(prev), sorted(now)
+
+
+def test_from_usernames_dedupes_and_keeps_usernames():
+    snap = Snapshot.from_usernames(["b", "a", "b", "ção"])
+    assert len(snap) == 3
+    assert sorted(snap.usernames()) == ["a", "b", "ção"]
+    assert "ção" in snap and "c" not in snap
+    assert list(snap.hashes) == sorted(snap.hashes)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("seed", range(5))
+def test_diff_matches_set_difference(engine, seed):
+    prev_names, now_names = _sets(seed, 2000, 0.1)
+    d = snapshot_diff.diff(Snapshot.from_usernames(prev_names), Snapshot.from_usernames(now_names), engine)
+    assert sorted(d.entered) == sorted(set(now_names) - set(prev_names))
+    assert sorted(d.left) == sorted(set(prev_names) - set(now_names))
+    assert d.retained == len(set(prev_names) & set(now_names))
+
+
+@pytest.mark.skipif(snapshot_diff.np is None, reason="numpy não instalado")
+@pytest.mark.parametrize("seed", range(10))
+def test_python_and_numpy_engines_agree(seed):
+    rng = random.Random(seed)
+    prev_names, now_names = _sets(seed, rng.choice([0, 1, 7, 500, 5000]), rng.random())
+    prev, now = Snapshot.from_usernames(prev_names), Snapshot.from_usernames(now_names)
+    entered_py, left_py, retained_py = snapshot_diff.diff_columns(prev.hashes, now.hashes, "python")
+    entered_np, left_np, retained_np = snapshot_diff.diff_columns(prev.hashes, now.hashes, "numpy")
+    assert list(entered_py) == list(entered_np)
+    assert list(left_py) == list(left_np)
+    assert retained_py == retained_np
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_diff_with_empty_sides(engine):
+    empty, some = Snapshot.from_usernames([]), Snapshot.from_usernames(["a", "b"])
+    assert snapshot_diff.diff(empty, some, engine).counts() == {"entered": 2, "left": 0, "retained": 0}
+    assert snapshot_diff.diff(some, empty, engine).counts() == {"entered": 0, "left": 2, "retained": 0}
+    assert snapshot_diff.diff(empty, empty, engine).counts() == {"entered": 0, "left": 0, "retained": 0}
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        snapshot_diff.diff_columns(Snapshot.from_usernames([]).hashes, Snapshot.from_usernames([]).hashes, "rust")
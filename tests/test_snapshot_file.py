@@ -0,0 +1,77 @@
+import struct
+
+import pytest
+
+import snapshot_diff, snapshot_file
+from snapshot_diff import Snapshot
+
+
+@pytest.mark.parametrize("names", [[], ["solo"], ["b", "a", "ção", "x" * 300]])
+def test_round_trip(tmp_path, names):
+    path = str(tmp_path / "s.igsnap")
+    snapshot_file.write_snapshot(path, Snapshot.from_usernames(names), 42)
+    with snapshot_file.open_snapshot(path) as snap:
+        assert snap.import_id == 42
+        assert len(snap) == len(names)
+        assert sorted(snap.usernames()) == sorted(names)
+        assert all(n in snap for n in names)
+        assert "missing" not in snap
+
+
+def test_without_import_id(tmp_path):
+    path = str(tmp_path / "s.igsnap")
+    snapshot_file.write_snapshot(path, Snapshot.from_usernames(["a"]))
+    with snapshot_file.open_snapshot(path) as snap:
+        assert snap.import_id is None
+
+
+def test_diff_runs_on_mapped_files(tmp_path):
+    prev_path, now_path = str(tmp_path / "a.igsnap"), str(tmp_path / "b.igsnap")
+    snapshot_file.write_snapshot(prev_path, Snapshot.from_usernames(["a", "b", "c"]))
+    snapshot_file.write_snapshot(now_path, Snapshot.from_usernames(["b", "c", "d"]))
+    with snapshot_file.open_snapshot(prev_path) as prev, snapshot_file.open_snapshot(now_path) as now:
+        d = snapshot_diff.diff(prev, now)
+        assert (list(d.entered), list(d.left), d.retained) == (["d"], ["a"], 2)
+
+
+@pytest.fixture
+def snapshot_bytes(tmp_path):
+    path = str(tmp_path / "s.igsnap")
+    snapshot_file.write_snapshot(path, Snapshot.from_usernames(["ann", "bob", "cy"]), 1)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("size", [0, 10, 63, 64, 80, -1])
+def test_truncated_file_is_rejected(tmp_path, snapshot_bytes, size):
+    path = tmp_path / "t.igsnap"
+    path.write_bytes(snapshot_bytes[:size])
+    with pytest.raises(ValueError):
+        snapshot_file.open_snapshot(str(path))
+
+
+@pytest.mark.parametrize("field, value", [(3, 1000), (5, 8), (7, 10 ** 6), (8, 1)])
+def test_corrupt_header_is_rejected(tmp_path, snapshot_bytes, field, value):
+    fields = list(snapshot_file.HEADER.unpack_from(snapshot_bytes))
+    fields[field] = value
+    path = tmp_path / "c.igsnap"
+    path.write_bytes(snapshot_file.HEADER.pack(*fields) + snapshot_bytes[snapshot_file.HEADER.size:])
+    with pytest.raises(ValueError):
+        snapshot_file.open_snapshot(str(path))
+
+
+def test_corrupt_offsets_are_rejected(tmp_path, snapshot_bytes):
+    data = bytearray(snapshot_bytes)
+    offsets_off = snapshot_file.HEADER.unpack_from(data)[6]
+    struct.pack_into("<Q", data, offsets_off, 5)
+    path = tmp_path / "o.igsnap"
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        snapshot_file.open_snapshot(str(path))
+
+
+def test_not_a_snapshot(tmp_path, snapshot_bytes):
+    path = tmp_path / "n.igsnap"
+    path.write_bytes(b"NOTSNAP\0" + snapshot_bytes[8:])
+    with pytest.raises(ValueError):
+        snapshot_file.open_snapshot(str(path))
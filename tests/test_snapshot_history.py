@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+import snapshot_diff, snapshot_history
+from snapshot_diff import Snapshot
+
+
+def _record_all(history, snapshots, first_id=1, step=1):
+    prev = Snapshot.from_usernames(())
+    checkpoints = []
+    for n, names in enumerate(snapshots):
+        now = Snapshot.from_usernames(names)
+        import_id = first_id + n * step
+        if history.record(import_id, snapshot_diff.diff(prev, now)):
+            checkpoints.append(import_id)
+        prev = now
+    return checkpoints
+
+
+def _random_snapshots(rng, count):
+    pool = [f"user{i}" for i in range(60)]
+    current = set(rng.sample(pool, 20))
+    out = []
+    for _ in range(count):
+        current -= set(rng.sample(sorted(current), min(len(current), rng.randint(0, 5))))
+        current |= set(rng.sample(pool, rng.randint(0, 5)))
+        out.append(sorted(current))
+    return out
+
+
+@pytest.mark.parametrize("interval", [1, 3, 10])
+def test_as_of_matches_every_recorded_import(tmp_path, interval):
+    history = snapshot_history.SnapshotHistory(str(tmp_path), "u", interval)
+    snapshots = _random_snapshots(random.Random(interval), 25)
+    checkpoints = _record_all(history, snapshots, first_id=100, step=2)
+
+    assert checkpoints == list(range(100, 150, 2 * interval))
+    for n, names in enumerate(snapshots):
+        assert sorted(history.as_of(100 + 2 * n).usernames()) == names
+        # An id between two imports resolves to the latest one before it
+        assert sorted(history.as_of(101 + 2 * n).usernames()) == names
+
+
+def test_as_of_before_the_first_checkpoint(tmp_path):
+    history = snapshot_history.SnapshotHistory(str(tmp_path), "u", 3)
+    _record_all(history, [["a"]], first_id=5)
+    with pytest.raises(ValueError):
+        history.as_of(4)
+
+
+def test_discard_from_allows_recording_again(tmp_path):
+    history = snapshot_history.SnapshotHistory(str(tmp_path), "u", 3)
+    _record_all(history, [["a"], ["a", "b"], ["b"], ["b", "c"], ["c"]])
+    history.discard_from(3)
+    assert history.imports() == [1, 2]
+
+    prev = history.as_of(2)
+    assert history.record(3, snapshot_diff.diff(prev, Snapshot.from_usernames(["z"]))) is False
+    assert sorted(history.as_of(3).usernames()) == ["z"]
+    assert history.record(4, snapshot_diff.diff(history.as_of(3), Snapshot.from_usernames(["y"]))) is True
+
+
+def test_followers_as_of(tmp_path):
+    _record_all(snapshot_history.SnapshotHistory(str(tmp_path), "u"), [["a", "b"], ["b", "c"]])
+    assert sorted(snapshot_history.followers_as_of(str(tmp_path), "u", 2).usernames()) == ["b", "c"]